@@ -1,34 +1,39 @@
-from groq import Groq
-import numpy as np
-import cv2
 import streamlit as st
-import uuid
 from datetime import datetime
 import time
 import random
+import uuid
+from contextlib import contextmanager
+from itertools import islice
 import os
-import sys
-import requests
-import json
-import speech_recognition as sr
-from PIL import Image
-import pytesseract
 from dotenv import load_dotenv
+from lazy_imports import import_report, mark_first_render
+from engine import AUTO_MODEL, DEFAULT_MODEL, MOCK_MODEL, Engine, EngineConfig, file_prompt
+from thread_store import ThreadStore
+from message_store import compact_messages
+from speech import SpeechListener, create_engine
+from asset_server import start_asset_server
+from theme import all_stylesheets, build_stylesheet, get_theme_colors, stylesheet_name
+from batch import batch_report, run_batch
+from chat_context import count_tokens
+from file_context import FileContextError
+from transcript import assistant_bubble_html, transcript_html
+from metrics import REGISTRY, STAGE_SECONDS, start_metrics_server
 
 load_dotenv()
 
 
-# OCR Setup
-try:
-    from pdf2image import convert_from_bytes
-    OCR_AVAILABLE = True
-    if sys.platform.startswith('win'):
-        pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-        if not os.path.exists(pytesseract.pytesseract.tesseract_cmd):
-            st.error("Tesseract not found at C:\\Program Files\\Tesseract-OCR\\tesseract.exe")
-            OCR_AVAILABLE = False
-except ImportError:
-    OCR_AVAILABLE = False
+# ---------- Engine ----------
+# OCR, prompt assembly and LLM calls live in engine.py, shared with cli.py and server.py;
+# this file keeps the Streamlit UI and per-session state.
+@st.cache_resource
+def get_engine() -> Engine:
+    return Engine(EngineConfig.from_env())
+
+
+ENGINE_CONFIG = get_engine().config
+if ENGINE_CONFIG.tesseract_cmd and not os.path.exists(ENGINE_CONFIG.tesseract_cmd):
+    st.error(f"Tesseract not found at {ENGINE_CONFIG.tesseract_cmd}")
 
 
 # Page config
@@ -43,7 +48,7 @@ st.set_page_config(
 # ---------- Base session ----------
 if "settings" not in st.session_state:
     st.session_state.settings = {
-        "model": "llama-3.1-8b-instant",
+        "model": DEFAULT_MODEL,
         "temperature": 0.7,
         "font_size": "Medium",
         "particles": False,
@@ -51,19 +56,11 @@ if "settings" not in st.session_state:
         "role": None,
         "ai_name": "Code Gen Ai",
         "theme": "Dark",
+        "stream": True,
     }
 
 
 # ---------- Mode prompts ----------
-BASE_MODE_PROMPTS = {
-    "Debug code": "You are a senior debugging assistant. Find and fix bugs in this code.",
-    "Solve problem": "You are a competitive programming expert. Solve the following problem with explanation and code.",
-    "Explain code": "You are a teacher. Explain what this code does step by step in simple language.",
-    "Practise code": "You are a coding coach. Give small practice tasks and solutions based on the topic.",
-    "Learn new technology": "You are a technology mentor. Explain and guide the user to learn new tools, frameworks, or technologies with practical examples.",
-}
-
-
 def get_modes_for_role(role: str):
     role = (role or "").lower()
     if role in ["student", "teacher", "coder"]:
@@ -73,439 +70,68 @@ def get_modes_for_role(role: str):
     return ["Debug code", "Solve problem", "Explain code", "Practise code"]
 
 
-# ---------- Theme Configurations ----------
-def get_theme_colors(theme):
-    if theme == "Dark":
-        return {
-            "bg_gradient_1": "#0f172a",
-            "bg_gradient_2": "#1e293b",
-            "bg_gradient_3": "#020617",
-            "text_primary": "#f8fafc",
-            "text_secondary": "#94a3b8",
-            "card_bg": "rgba(30, 41, 59, 0.7)",
-            "card_border": "rgba(148, 163, 184, 0.1)",
-            "sidebar_bg": "rgba(15, 23, 42, 0.95)",
-            "user_bubble": "#2563eb",
-            "user_text": "#ffffff",
-            "assistant_bubble": "rgba(30, 41, 59, 0.7)",
-            "assistant_text": "#f1f5f9",
-            "accent": "#3b82f6",
-            "accent_glow": "rgba(59, 130, 246, 0.5)",
-            "input_bg": "rgba(15, 23, 42, 0.6)",
-            "input_border": "rgba(59, 130, 246, 0.3)",
-            "shadow": "0 3px 4px rgba(0, 0, 0, 0.25)",
-            "button_text": "#ffffff",
-            "code_bg": "#0f172a",
-            "code_text": "#e2e8f0",
-        }
-    else:  # Light theme
-        return {
-            "bg_gradient_1": "#f8fafc",
-            "bg_gradient_2": "#e2e8f0",
-            "bg_gradient_3": "#f1f5f9",
-            "text_primary": "#000000",      # Pure black
-            "text_secondary": "#333333",    # Dark gray
-            "card_bg": "rgba(255, 255, 255, 0.85)",
-            "card_border": "rgba(203, 213, 225, 0.6)",
-            "sidebar_bg": "rgba(255, 255, 255, 0.98)",
-            "user_bubble": "#2563eb",
-            "user_text": "#ffffff",
-            "assistant_bubble": "rgba(255, 255, 255, 0.9)",
-            "assistant_text": "#1e293b",
-            "accent": "#2563eb",
-            "accent_glow": "rgba(37, 99, 235, 0.3)",
-            "input_bg": "rgba(255, 255, 255, 0.8)",
-            "input_border": "rgba(37, 99, 235, 0.2)",
-            "shadow": "0 3px 6px rgba(15, 23, 42, 0.15)",
-            "button_text": "#ffffff",
-            "code_bg": "#f1f5f9",
-            "code_text": "#334155",
-        }
-
-
 # ---------- Global CSS Injection ----------
-def inject_css(theme):
-    colors = get_theme_colors(theme)
-    font_size_map = {"Small": "14px", "Medium": "16px", "Large": "18px"}
-    current_font_size = font_size_map.get(st.session_state.settings["font_size"], "16px")
-
-    # Light mode sidebar CSS (BLACK TEXT + Model dropdown WHITE on BLUE)
-    light_sidebar_css = """
-    [data-testid="stSidebar"] *,
-    [data-testid="stSidebar"] label,
-    [data-testid="stSidebar"] div,
-    [data-testid="stSidebar"] p,
-    [data-testid="stSidebar"] h1, 
-    [data-testid="stSidebar"] h2, 
-    [data-testid="stSidebar"] h3 {
-        color: #000000 !important;
-    }
-    /* LIGHT MODE: Model dropdown WHITE TEXT on BLUE BG */
-    [data-testid="stSidebar"] [data-baseweb="select"] {
-        color: #ffffff !important;
-        background: rgba(37, 99, 235, 0.8) !important;
-    }
-    [data-testid="stSidebar"] [data-baseweb="select"] option {
-        color: #000000 !important;
-        background: #ffffff !important;
-    }
-    [data-testid="stSidebar"] [role="combobox"] {
-        color: #ffffff !important;
-    }
-    """ if theme == "Light" else ""
-
-    # Dark mode sidebar CSS
-    dark_sidebar_css = """
-    [data-testid="stSidebar"] *,
-    [data-testid="stSidebar"] label,
-    [data-testid="stSidebar"] div,
-    [data-testid="stSidebar"] p,
-    [data-testid="stSidebar"] h1, 
-    [data-testid="stSidebar"] h2, 
-    [data-testid="stSidebar"] h3 {
-        color: #f8fafc !important;
-    }
-    """ if theme == "Dark" else ""
+# The stylesheet is built once per theme/font size (theme.build_stylesheet) and written to the
+# static/ folder next to this script, which Streamlit serves from the same origin at /app/static/
+# (server.enableStaticServing, see .streamlit/config.toml). File names are content-hashed, so each
+# rerun only sends a <link> tag and the browser revalidates the file instead of re-downloading it.
+# Setting ASSET_BASE_URL serves the files from a separate static server with immutable caching
+# instead; with neither available the stylesheet is inlined.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+ASSET_BASE_URL = os.getenv("ASSET_BASE_URL", "").rstrip("/")
+ASSET_PORT = int(os.getenv("ASSET_PORT", "8510"))
+ASSET_HOST = os.getenv("ASSET_HOST", "127.0.0.1")
+
+
+@st.cache_resource
+def start_asset_endpoint():
+    """Base URL the browser loads stylesheets from, or "" to inline them."""
+    if ASSET_BASE_URL:
+        try:
+            start_asset_server(ASSET_PORT, ASSET_HOST)
+        except OSError:
+            # Another Streamlit worker on this host already serves the port (with the same files)
+            pass
+        return f"{ASSET_BASE_URL}/static"
+    if not st.get_option("server.enableStaticServing"):
+        return ""
+    try:
+        write_static_stylesheets(STATIC_DIR)
+    except OSError:
+        return ""
+    base_path = st.get_option("server.baseUrlPath").strip("/")
+    return f"/{base_path}/app/static" if base_path else "/app/static"
+
+
+def write_static_stylesheets(directory):
+    """Write every theme stylesheet into `directory` and remove ones left by older builds."""
+    os.makedirs(directory, exist_ok=True)
+    stylesheets = all_stylesheets()
+    for name, css in stylesheets.items():
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            continue
+        # Write then rename, so another worker never serves a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(css)
+        os.replace(tmp_path, path)
+    for name in os.listdir(directory):
+        if name.startswith("theme-") and name.endswith(".css") and name not in stylesheets:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
 
-    st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-
-    html, body {{
-        font-family: 'Inter', sans-serif;
-        font-size: {current_font_size};
-        color: {colors['text_primary']};
-        background-color: transparent;
-    }}
-
-    .stApp {{
-        background: linear-gradient(-45deg, {colors['bg_gradient_1']}, {colors['bg_gradient_2']}, {colors['bg_gradient_3']}, {colors['bg_gradient_1']});
-        background-size: 400% 400%;
-        animation: gradientBG 15s ease infinite;
-        min-height: 100vh;
-        padding-top: 0;
-    }}
-
-    @keyframes gradientBG {{
-        0% {{ background-position: 0% 50%; }}
-        50% {{ background-position: 100% 50%; }}
-        100% {{ background-position: 0% 50%; }}
-    }}
-
-    header[data-testid="stHeader"], footer {{
-        visibility: hidden;
-        height: 0;
-        position: fixed;
-    }}
-
-    .main .block-container {{
-        padding-top: 0.8rem;
-        padding-bottom: 0.8rem;
-        padding-left: 1.5rem;
-        padding-right: 1.5rem;
-    }}
-
-    [data-testid="stSidebar"] {{
-        background: {colors['sidebar_bg']} !important;
-        backdrop-filter: blur(12px);
-        -webkit-backdrop-filter: blur(12px);
-        border-right: 1px solid {colors['card_border']} !important;
-        padding-top: 0.6rem;
-        padding-bottom: 0.6rem;
-        padding-left: 0.6rem;
-        padding-right: 0.6rem;
-        transition: width 0.3s ease, padding 0.3s ease;
-        width: 260px !important;
-        min-width: 260px !important;
-        max-width: 260px !important;
-    }}
-
-    /* LIGHT MODE SIDEBAR */
-    {light_sidebar_css}
-
-    /* DARK MODE SIDEBAR */
-    {dark_sidebar_css}
-
-    [data-testid="stSidebar"] > div:first-child {{
-        background: transparent;
-        width: 100%;
-    }}
-
-    ::-webkit-scrollbar {{
-        width: 6px;
-        height: 6px;
-    }}
-    ::-webkit-scrollbar-track {{
-        background: transparent;
-    }}
-    ::-webkit-scrollbar-thumb {{
-        background: {colors['card_border']};
-        border-radius: 4px;
-    }}
-    ::-webkit-scrollbar-thumb:hover {{
-        background: {colors['text_secondary']};
-    }}
-
-    .stButton > button {{
-        background: linear-gradient(135deg, {colors['accent']}, #1d4ed8) !important;
-        color: {colors['button_text']} !important;
-        border: none !important;
-        border-radius: 10px !important;
-        font-weight: 500 !important;
-        padding: 0.25rem 0.6rem !important;
-        font-size: 0.84rem !important;
-        box-shadow: {colors['shadow']};
-        transition: all 0.25s ease !important;
-        position: relative;
-        overflow: hidden;
-        min-height: 32px;
-    }}
-
-    .stButton > button:hover {{
-        transform: translateY(-1px);
-        box-shadow: 0 8px 16px -4px {colors['accent_glow']};
-    }}
-
-    .stButton > button:active {{
-        transform: translateY(0);
-    }}
-
-    .stTextInput > div > div > input,
-    .stTextArea > div > div > textarea,
-    .stSelectbox > div > div > select {{
-        background: {colors['input_bg']} !important;
-        border: 1px solid {colors['input_border']} !important;
-        color: {colors['text_primary']} !important;
-        border-radius: 10px !important;
-        backdrop-filter: blur(4px);
-        padding-top: 0.3rem !important;
-        padding-bottom: 0.3rem !important;
-    }}
-
-    [data-testid="stChatInput"] > div {{
-        background: {colors['input_bg']};
-        border: 1px solid {colors['input_border']};
-        border-radius: 18px;
-        box-shadow: {colors['shadow']};
-        backdrop-filter: blur(10px);
-        padding: 0.15rem 0.6rem !important;
-        transition: all 0.3s ease;
-        min-height: 42px;
-    }}
-
-    [data-testid="stChatInput"] textarea {{
-        min-height: 24px !important;
-        max-height: 80px !important;
-        padding-top: 0.25rem !important;
-        padding-bottom: 0.25rem !important;
-    }}
-
-    [data-testid="stChatInput"] > div:focus-within {{
-        border-color: {colors['accent']};
-        box-shadow: 0 0 0 2px {colors['accent_glow']};
-    }}
-
-    .chat-message {{
-        display: flex;
-        align-items: flex-start;
-        margin-bottom: 0.9rem;
-        animation: fadeIn 0.3s ease-out;
-    }}
-
-    @keyframes fadeIn {{
-        from {{ opacity: 0; transform: translateY(6px); }}
-        to {{ opacity: 1; transform: translateY(0); }}
-    }}
-
-    .user-message {{
-        justify-content: flex-end;
-    }}
-
-    .avatar {{
-        width: 32px;
-        height: 32px;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        margin: 0 6px;
-        flex-shrink: 0;
-        box-shadow: {colors['shadow']};
-        font-size: 0.9rem;
-    }}
-
-    .message-content {{
-        padding: 0.6rem 0.75rem;
-        border-radius: 14px;
-        max-width: 80%;
-        position: relative;
-        box-shadow: {colors['shadow']};
-        backdrop-filter: blur(6px);
-        word-wrap: break-word;
-        font-size: 0.92rem;
-    }}
-
-    .user-message .message-content {{
-        background: {colors['user_bubble']};
-        color: {colors['user_text']};
-        border-radius: 14px 14px 3px 14px;
-    }}
-
-    .assistant-message .message-content {{
-        background: {colors['assistant_bubble']};
-        color: {colors['assistant_text']};
-        border-radius: 14px 14px 14px 3px;
-        border: 1px solid {colors['card_border']};
-    }}
-
-    .mode-card {{
-        background: {colors['card_bg']};
-        border: 1px solid {colors['card_border']};
-        border-radius: 12px;
-        padding: 0.5rem 0.6rem;
-        text-align: center;
-        cursor: pointer;
-        transition: all 0.25s ease;
-        backdrop-filter: blur(8px);
-        box-shadow: {colors['shadow']};
-        height: 100%;
-        color: {colors['text_primary']};
-        margin-bottom: 0.4rem;
-    }}
-
-    .mode-card div:first-child {{
-        font-size: 1.4rem;
-        margin-bottom: 0.25rem;
-    }}
-
-    .mode-card div:nth-child(2) {{
-        font-size: 0.9rem;
-    }}
-
-    .mode-card div:nth-child(3) {{
-        font-size: 0.7rem;
-    }}
-
-    .mode-card:hover {{
-        transform: translateY(-2px);
-        box-shadow: 0 8px 14px {colors['accent_glow']};
-        border-color: {colors['accent']};
-    }}
-
-    .mode-card.active {{
-        background: linear-gradient(135deg, {colors['accent']}, #1d4ed8);
-        color: white;
-        border: none;
-    }}
-
-    .file-preview {{
-        background: {colors['card_bg']};
-        border: 1px solid {colors['card_border']};
-        border-radius: 10px;
-        padding: 0.6rem 0.75rem;
-        margin-bottom: 0.6rem;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        backdrop-filter: blur(8px);
-        box-shadow: {colors['shadow']};
-        color: {colors['text_primary']};
-        font-size: 0.86rem;
-    }}
-
-    .welcome-container {{
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        justify-content: center;
-        position: relative;
-        z-index: 10;
-    }}
-
-    .welcome-card {{
-        background: {colors['card_bg']};
-        backdrop-filter: blur(16px);
-        -webkit-backdrop-filter: blur(16px);
-        border: 1px solid {colors['card_border']};
-        border-radius: 20px;
-        padding: 2rem 2.2rem;
-        width: 100%;
-        max-width: 420px;
-        box-shadow: 0 22px 40px -14px {colors['accent_glow']};
-        animation: slideUp 0.4s ease-out;
-        color: {colors['text_primary']};
-    }}
-
-    @keyframes slideUp {{
-        from {{ opacity: 0; transform: translateY(18px); }}
-        to {{ opacity: 1; transform: translateY(0); }}
-    }}
-
-    .logo-container {{
-        width: 96px;
-        height: 96px;
-        background: linear-gradient(135deg, {colors['accent']}, #1d4ed8);
-        border-radius: 24px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 46px;
-        margin: 0 auto 1.4rem;
-        box-shadow: 0 18px 32px {colors['accent_glow']};
-        animation: float 6s ease-in-out infinite;
-    }}
-
-    @keyframes float {{
-        0% {{ transform: translateY(0px); }}
-        50% {{ transform: translateY(-8px); }}
-        100% {{ transform: translateY(0px); }}
-    }}
-
-    pre {{
-        background: {colors['code_bg']} !important;
-        color: {colors['code_text']} !important;
-        border-radius: 6px !important;
-        padding: 0.7rem !important;
-        border: 1px solid {colors['card_border']} !important;
-        font-size: 0.86rem !important;
-    }}
-
-    .streamlit-expanderHeader {{
-        background: {colors['card_bg']} !important;
-        color: {colors['text_primary']} !important;
-        border: 1px solid {colors['card_border']} !important;
-        border-radius: 6px !important;
-        padding-top: 0.35rem !important;
-        padding-bottom: 0.35rem !important;
-        font-size: 0.9rem !important;
-    }}
-
-    [data-testid="stSidebarHeader"] > button {{
-        background: transparent !important;
-        color: {colors['text_primary']} !important;
-    }}
-    </style>
-    """, unsafe_allow_html=True)
 
-    st.markdown("""
-    <script>
-    document.addEventListener('DOMContentLoaded', function() {
-        const toggleButton = document.querySelector('[data-testid="stSidebarHeader"] > button');
-        if (toggleButton) {
-            toggleButton.addEventListener('click', function() {
-                setTimeout(() => {
-                    const sidebar = document.querySelector('[data-testid="stSidebar"]');
-                    if (sidebar) {
-                        sidebar.style.display = 'none';
-                        sidebar.offsetHeight;
-                        sidebar.style.display = '';
-                    }
-                }, 100);
-            });
-        }
-    });
-    </script>
-    """, unsafe_allow_html=True)
+def inject_css(theme):
+    font_size = st.session_state.settings["font_size"]
+    base_url = start_asset_endpoint()
+    if base_url:
+        href = f"{base_url}/{stylesheet_name(theme, font_size)}"
+        st.markdown(f'<link rel="stylesheet" href="{href}">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{build_stylesheet(theme, font_size)}</style>", unsafe_allow_html=True)
 
 
 # Inject CSS immediately
@@ -514,14 +140,12 @@ inject_css(st.session_state.settings["theme"])
 
 # ---------- Welcome gate ----------
 if not st.session_state.settings["user_name"] or not st.session_state.settings["role"]:
-    colors = get_theme_colors(st.session_state.settings["theme"])
-
-    st.markdown(f"""
+    st.markdown("""
     <div class="welcome-container">
         <div class="logo-container">💻</div>
-        <h1 style="text-align: center; margin-bottom: 0.3rem; font-weight: 700; font-size: 2.1rem; color: {colors['text_primary']};">Code Gen Ai</h1>
-        <p style="text-align: center; margin-bottom: 1.2rem; opacity: 0.8; color: {colors['text_secondary']};">Personalized coding workspace</p>
-        <h2 style="text-align: center; margin-bottom: 0.9rem; font-weight: 600; font-size: 1.4rem; color: {colors['text_primary']};">Enter your details</h2>
+        <h1 class="welcome-title">Code Gen Ai</h1>
+        <p class="welcome-subtitle">Personalized coding workspace</p>
+        <h2 class="welcome-prompt">Enter your details</h2>
     </div>
     """, unsafe_allow_html=True)
 
@@ -546,22 +170,51 @@ if not st.session_state.settings["user_name"] or not st.session_state.settings["
         else:
             st.error("⚠️ Please enter your name!")
 
+    mark_first_render()
     st.stop()
 
 
+# ---------- Chat history store ----------
+CHAT_DB_PATH = os.getenv("CHAT_DB_PATH", "chat_history.db")
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "50"))
+CHAT_RENDER_WINDOW = int(os.getenv("CHAT_RENDER_WINDOW", "20"))  # messages drawn per rerun
+CHAT_MEMORY_CAP = int(os.getenv("CHAT_MEMORY_CAP_KB", "1024")) * 1024  # loaded messages per session
+
+
+@st.cache_resource
+def get_thread_store() -> ThreadStore:
+    return ThreadStore(CHAT_DB_PATH)
+
+
+def thread_owner():
+    # History belongs to this browser, not to the display name typed at the welcome gate (which
+    # anyone can repeat). A random id is minted once and kept in the URL, so reloads and bookmarks
+    # of that URL reopen the same chats.
+    if "owner_id" not in st.session_state:
+        owner_id = st.query_params.get("uid", "")
+        try:
+            owner_id = str(uuid.UUID(owner_id))
+        except ValueError:
+            owner_id = str(uuid.uuid4())
+        st.query_params["uid"] = owner_id
+        st.session_state.owner_id = owner_id
+    return st.session_state.owner_id
+
+
 # ---------- Session State Initialization ----------
+# Only thread metadata lives in the session; messages are paged in for the active thread.
+# chat_threads maps id -> metadata in creation order (oldest first), so it is both the
+# ordered thread list and the lookup index.
 if "chat_threads" not in st.session_state:
-    st.session_state.chat_threads = []
+    st.session_state.chat_threads = {
+        t["id"]: t for t in reversed(get_thread_store().list_threads(thread_owner()))
+    }
 
 if "active_thread_id" not in st.session_state:
-    new_id = str(uuid.uuid4())
-    st.session_state.chat_threads.append({
-                "id": new_id,
-        "title": "New Chat",
-        "messages": [],
-        "created": datetime.now()
-    })
-    st.session_state.active_thread_id = new_id
+    if not st.session_state.chat_threads:
+        new_thread = get_thread_store().create_thread(thread_owner())
+        st.session_state.chat_threads[new_thread["id"]] = new_thread
+    st.session_state.active_thread_id = next(reversed(st.session_state.chat_threads))
 
 if "ocr_context" not in st.session_state:
     st.session_state.ocr_context = {"text": None, "filename": None}
@@ -579,45 +232,93 @@ if "processing" not in st.session_state:
 if "last_prompt" not in st.session_state:
     st.session_state.last_prompt = ""
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+LLM_PROVIDER = ENGINE_CONFIG.llm_provider  # "groq" or "ollama"
+OLLAMA_MODELS = ENGINE_CONFIG.ollama_models
 
-if not GROQ_API_KEY:
+if LLM_PROVIDER == "groq" and not ENGINE_CONFIG.groq_api_key:
     st.error("❌ GROQ_API_KEY not found. Set it in .env file")
     st.stop()
 
+
 # ---------- Helper Functions ----------
+def open_thread(meta):
+    messages, has_more = get_thread_store().load_messages(meta["id"], limit=CHAT_PAGE_SIZE)
+    thread = {
+        "id": meta["id"],
+        "title": meta["title"],
+        "created": meta["created"],
+        "messages": messages,
+        "has_more": has_more,
+        "window": CHAT_RENDER_WINDOW,
+    }
+    compact_thread(thread)
+    return thread
+
+
+def compact_thread(thread):
+    # Messages outside the rendered window are compressed; past the cap the oldest are dropped
+    # from memory (they stay in the store and page back in with "Load earlier messages")
+    if compact_messages(thread["messages"], thread["window"], CHAT_MEMORY_CAP):
+        thread["has_more"] = True
+
+
 def get_active_thread():
-    for thread in st.session_state.chat_threads:
-        if thread["id"] == st.session_state.active_thread_id:
-            return thread
-    return st.session_state.chat_threads[0]
+    active = st.session_state.get("active_thread")
+    if active is None or active["id"] != st.session_state.active_thread_id:
+        meta = st.session_state.chat_threads.get(st.session_state.active_thread_id)
+        if meta is None:
+            meta = st.session_state.chat_threads[next(reversed(st.session_state.chat_threads))]
+        active = open_thread(meta)
+        st.session_state.active_thread = active
+        st.session_state.active_thread_id = active["id"]
+    return active
+
+
+def load_earlier_messages(thread):
+    if not thread["has_more"] or not thread["messages"]:
+        return
+    earlier, has_more = get_thread_store().load_messages(
+        thread["id"], before_id=thread["messages"][0]["id"], limit=CHAT_PAGE_SIZE
+    )
+    thread["messages"][:0] = earlier
+    thread["has_more"] = has_more
+    compact_thread(thread)
+
+
+def add_message(thread, role, content):
+    thread["messages"].append(get_thread_store().add_message(thread["id"], role, content))
+    compact_thread(thread)
 
 
 def create_new_chat():
-    new_id = str(uuid.uuid4())
-    new_thread = {
-        "id": new_id,
-        "title": "New Chat",
-        "messages": [],
-        "created": datetime.now()
-    }
-    st.session_state.chat_threads.insert(0, new_thread)
-    st.session_state.active_thread_id = new_id
+    new_thread = get_thread_store().create_thread(thread_owner())
+    st.session_state.chat_threads[new_thread["id"]] = new_thread
+    st.session_state.active_thread_id = new_thread["id"]
 
 
 def delete_thread(thread_id):
-    st.session_state.chat_threads = [t for t in st.session_state.chat_threads if t["id"] != thread_id]
+    get_thread_store().delete_thread(thread_id)
+    st.session_state.chat_threads.pop(thread_id, None)
     if not st.session_state.chat_threads:
         create_new_chat()
     else:
-        st.session_state.active_thread_id = st.session_state.chat_threads[0]["id"]
+        st.session_state.active_thread_id = next(reversed(st.session_state.chat_threads))
+
+
+def clear_all_threads():
+    get_thread_store().delete_all(thread_owner())
+    st.session_state.chat_threads = {}
+    create_new_chat()
 
 
 def rename_thread(thread_id, new_name):
-    for thread in st.session_state.chat_threads:
-        if thread["id"] == thread_id:
-            thread["title"] = new_name
-            break
+    get_thread_store().rename_thread(thread_id, new_name)
+    thread = st.session_state.chat_threads.get(thread_id)
+    if thread is not None:
+        thread["title"] = new_name
+    active = st.session_state.get("active_thread")
+    if active is not None and active["id"] == thread_id:
+        active["title"] = new_name
 
 
 def derive_thread_title(thread):
@@ -639,59 +340,210 @@ def generate_title(text):
     return title[:40] + "..." if len(title) > 40 else title
 
 
-def call_groq_api(prompt: str, model: str = "llama-3.1-8b-instant") -> str:
-    client = Groq(api_key=GROQ_API_KEY)
+# ---------- Metrics ----------
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # 0 disables the /metrics endpoint
+
+
+def record_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    # Collected per prompt for the optional timing breakdown under the answer
+    st.session_state.setdefault("pending_timings", {})[stage] = seconds
+
+
+def stage_recorder():
+    # Engine stages (already exported to STAGE_SECONDS) for the timing breakdown. Bound to this
+    # session's dict up front so pool threads can report without a Streamlit script context.
+    return st.session_state.setdefault("pending_timings", {}).__setitem__
+
+
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model=model,
-            temperature=0.7,
-            max_tokens=4000,
-            stream=False
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+# ---------- LLM calls ----------
+def get_response_cache():
+    return get_engine().response_cache
+
+
+def get_routing_stats():
+    return get_engine().routing_stats
+
+
+def current_session_id():
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    return st.session_state.session_id
+
+
+def prepare_prompt(question: str, file_context, model: str):
+    """(prompt, system) for the pending turn via Engine.prepare_text, with progress for large files."""
+    file_text = (file_context["filename"], file_context["text"]) if file_context else None
+    progress = None
+    # Over FILE_CONTEXT_TOKENS the file is chunked and mapped in parallel (engine.budget_prompt)
+    if file_text and model != MOCK_MODEL and count_tokens(file_prompt(*file_text, question)) > ENGINE_CONFIG.file_context_tokens:
+        progress = st.progress(0.0, text="Large file: analyzing parts...")
+
+    def on_progress(done, total):
+        progress.progress(done / total, text=f"Large file: part {done}/{total}")
+
+    try:
+        return get_engine().prepare_text(
+            question,
+            st.session_state.get("mode"),
+            model,
+            file_text,
+            current_session_id(),
+            stage_recorder(),
+            on_progress if progress else None,
         )
-        return chat_completion.choices[0].message.content
-    except Exception as e:
-        return f"Groq Error: {str(e)}"
+    finally:
+        if progress:
+            progress.empty()
+
+
+# Re-rendering the bubble on every token is wasteful; flush at most this often
+STREAM_RENDER_INTERVAL = 0.05
+
+
+def render_streamed_answer(deltas, placeholder, colors):
+    timestamp = datetime.now().strftime("%H:%M")
+    placeholder.markdown(assistant_bubble_html("▌", timestamp, colors), unsafe_allow_html=True)
+    answer = ""
+    last_render = 0.0
+    for delta in deltas:
+        answer += delta
+        now = time.monotonic()
+        if now - last_render >= STREAM_RENDER_INTERVAL:
+            placeholder.markdown(assistant_bubble_html(answer + "▌", timestamp, colors), unsafe_allow_html=True)
+            last_render = now
+    placeholder.markdown(assistant_bubble_html(answer, timestamp, colors), unsafe_allow_html=True)
+    return answer
+
+
+# ---------- Speech ----------
+# Capture and transcription run on a background thread (speech.SpeechListener); the mic button
+# only starts/stops it and a polling fragment reruns the app once the text is ready.
+SPEECH_ENGINE = os.getenv("SPEECH_ENGINE", "vosk")  # "vosk" or "whisper.cpp"
+SPEECH_MODEL_PATH = os.getenv("SPEECH_MODEL_PATH")  # Vosk model dir or whisper.cpp ggml file
+WHISPER_CPP_BINARY = os.getenv("WHISPER_CPP_BINARY", "whisper-cli")
+SPEECH_SILENCE_MS = int(os.getenv("SPEECH_SILENCE_MS", "700"))  # silence that ends an utterance
+SPEECH_MAX_SECONDS = float(os.getenv("SPEECH_MAX_SECONDS", "15"))
+SPEECH_POLL_INTERVAL = float(os.getenv("SPEECH_POLL_INTERVAL", "0.5"))
+
+
+@st.cache_resource
+def get_speech_engine():
+    # Models are loaded once per process and shared by every session's listener
+    return create_engine(SPEECH_ENGINE, SPEECH_MODEL_PATH, WHISPER_CPP_BINARY)
+
+
+def start_listening():
+    return SpeechListener(
+        get_speech_engine(),
+        silence_ms=SPEECH_SILENCE_MS,
+        max_seconds=SPEECH_MAX_SECONDS,
+    ).start()
+
+
+def get_ocr_cache():
+    return get_engine().ocr_cache
+
 
+def extract_upload_text(fname: str, data: bytes) -> str:
+    progress = st.progress(0.0, text="OCR: reading PDF...") if fname.lower().endswith(".pdf") else None
+
+    def on_page(done, total):
+        progress.progress(done / total, text=f"OCR: page {done}/{total}")
 
-def recognize_speech():
-    r = sr.Recognizer()
     try:
-        with sr.Microphone() as source:
-            with st.spinner("Listening..."):
-                audio = r.listen(source, phrase_time_limit=5)
-        return r.recognize_google(audio)
-    except Exception:
-        return None
+        return get_engine().extract_file_text(fname, data, on_page=on_page if progress else None, on_stage=stage_recorder())
+    finally:
+        if progress:
+            progress.empty()
 
 
 def extract_text_from_image(file_obj):
     try:
         file_obj.seek(0)
-        img = Image.open(file_obj)
-        text = pytesseract.image_to_string(img).strip()
-        cleaned = " ".join(text.split())
-        st.success(f"✅ OCR: {len(cleaned)} chars")
-        return cleaned[:4000]
+        data = file_obj.read()
+        cleaned, cached = get_engine().extract_file(file_obj.name, data, on_stage=stage_recorder())
+        st.success(f"✅ OCR: {len(cleaned)} chars{' (cached)' if cached else ''}")
+        return cleaned
     except Exception as e:
         st.error(f"❌ OCR: {e}")
         return ""
 
 
+# ---------- Batch upload ----------
+BATCH_EXTRACT_WORKERS = int(os.getenv("BATCH_EXTRACT_WORKERS", "4"))
+BATCH_LLM_WORKERS = int(os.getenv("BATCH_LLM_WORKERS", "4"))  # the scheduler still enforces model limits
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+
+
+def batch_answer_fn(question: str, model: str, mode: str):
+    engine = get_engine()
+    session_id = current_session_id()
+    on_stage = stage_recorder()
+
+    def answer(fname, text):
+        prompt, system = engine.prepare_text(question, mode, model, (fname, text), session_id, on_stage)
+        return engine.answer(prompt, model, system, session_id=session_id, on_stage=on_stage)[0]
+
+    return answer
+
+
+def run_batch_job(files, question: str):
+    model = st.session_state.settings.get("model", DEFAULT_MODEL)
+    # Bound up front: run_batch calls these from pool threads, which have no Streamlit script context
+    engine = get_engine()
+    stage_recorder_fn = stage_recorder()
+    progress = st.progress(0.0, text=f"Batch: 0/{len(files)} files")
+    partial = st.container()
+    results = []
+    with timed("batch"):
+        for result in run_batch(
+            files,
+            lambda name, data: engine.extract_file_text(name, data, on_stage=stage_recorder_fn),
+            batch_answer_fn(question, model, st.session_state.get("mode")),
+            extract_workers=BATCH_EXTRACT_WORKERS,
+            answer_workers=BATCH_LLM_WORKERS,
+        ):
+            results.append(result)
+            progress.progress(len(results) / len(files), text=f"Batch: {len(results)}/{len(files)} files")
+            with partial.expander(f"{'⚠️' if result['error'] else '✅'} {result['filename']}"):
+                st.markdown(result["error"] or result["answer"] or "")
+    return batch_report(results, question)
+
+
+@st.cache_resource
+def start_metrics_endpoint():
+    REGISTRY.register_cache("ocr", get_ocr_cache())
+    REGISTRY.register_cache("response", get_response_cache())
+    if not METRICS_PORT:
+        return None
+    try:
+        return start_metrics_server(METRICS_PORT)
+    except OSError:
+        # Another Streamlit worker on this host already serves the port
+        return None
+
+
+start_metrics_endpoint()
+
+
 # ---------- Sidebar ----------
 with st.sidebar:
-    colors = get_theme_colors(st.session_state.settings["theme"])
-
-    st.markdown(f"""
-    <div style='text-align: left; padding: 0 0 0.6rem 0; border-bottom: 1px solid {colors['card_border']}; margin-bottom: 0.8rem;'>
-        <div style='display:flex; align-items:center; gap:0.6rem;'>
-            <div style='width:32px;height:32px;border-radius:10px;
-                        background:linear-gradient(135deg,{colors['accent']},#1d4ed8);
-                        display:flex;align-items:center;justify-content:center;font-size:18px; box-shadow: {colors['shadow']};'>💻</div>
-            <div>
-                <div style='color:{colors['text_primary']};font-weight:600;font-size:0.98rem;'>Code Gen Ai</div>
-                <div style='color:{colors['text_secondary']};font-size:0.75rem;'>Coding copilot</div>
-            </div>
+    st.markdown("""
+    <div class="sidebar-brand">
+        <div class="app-logo">💻</div>
+        <div>
+            <div class="app-title">Code Gen Ai</div>
+            <div class="app-subtitle">Coding copilot</div>
         </div>
     </div>
     """, unsafe_allow_html=True)
@@ -714,8 +566,16 @@ with st.sidebar:
         "qwen/qwen3-32b",
         "meta-llama/llama-4-scout-17b-16e-instruct"
     ]
-    options = base_models + ["Mock Mode (Demo)"]
-    st.session_state.settings["model"] = st.selectbox("Active model", options, label_visibility="collapsed")
+    if LLM_PROVIDER == "ollama":
+        base_models = OLLAMA_MODELS
+    options = [AUTO_MODEL] + base_models + [MOCK_MODEL]
+    st.session_state.settings["model"] = st.selectbox("Active model", options, index=1, label_visibility="collapsed")
+    if st.session_state.settings["model"] == AUTO_MODEL:
+        routing = get_routing_stats().summary()
+        answered = ", ".join(f"{m.split('/')[-1]}: {n}" for m, n in routing["answered"].items()) or "no answers yet"
+        saved = routing["seconds_saved"]
+        saved = "" if not saved else f", ~{saved:.0f}s saved" if saved > 0 else f", ~{-saved:.0f}s lost to escalations"
+        st.caption(f"Auto answered by {answered}; {sum(routing['escalations'].values())} escalated{saved}")
 
     st.markdown("##### Preferences")
     st.session_state.settings["particles"] = st.toggle(
@@ -723,6 +583,16 @@ with st.sidebar:
         value=st.session_state.settings["particles"],
         label_visibility="visible"
     )
+    st.session_state.settings["stream"] = st.toggle(
+        "Stream responses",
+        value=st.session_state.settings.get("stream", True),
+        label_visibility="visible"
+    )
+    st.session_state.settings["show_timings"] = st.toggle(
+        "Show timings",
+        value=st.session_state.settings.get("show_timings", False),
+        label_visibility="visible"
+    )
     st.session_state.settings["font_size"] = st.select_slider(
         "Font size",
         options=["Small", "Medium", "Large"],
@@ -730,6 +600,19 @@ with st.sidebar:
         label_visibility="visible"
     )
 
+    ocr_stats = get_ocr_cache().stats()
+    st.caption(
+        f"OCR cache: {ocr_stats['memory_hits'] + ocr_stats['disk_hits']} hits "
+        f"({ocr_stats['disk_hits']} disk) / {ocr_stats['misses']} misses, "
+        f"{ocr_stats['entries']} in memory"
+    )
+    response_stats = get_response_cache().stats()
+    st.caption(
+        f"Response cache: {response_stats['memory_hits'] + response_stats['disk_hits']} hits / "
+        f"{response_stats['misses']} misses ({response_stats['hit_rate']:.0%}), "
+        f"{get_engine().inflight.coalesced + get_engine().stream_flights.coalesced} coalesced"
+    )
+
     st.markdown("##### Chats")
     col_new, col_clear = st.columns([0.7, 0.3])
     with col_new:
@@ -738,11 +621,10 @@ with st.sidebar:
             st.rerun()
     with col_clear:
         if st.button("🗑️ All"):
-            st.session_state.chat_threads = []
-            create_new_chat()
+            clear_all_threads()
             st.rerun()
 
-    for thread in st.session_state.chat_threads[-10:]:
+    for thread in islice(reversed(st.session_state.chat_threads.values()), 10):
         if st.button(f"💬 {derive_thread_title(thread)[:22]}", key=thread["id"], use_container_width=True):
             st.session_state.active_thread_id = thread["id"]
             st.rerun()
@@ -759,18 +641,11 @@ colors = get_theme_colors(st.session_state.settings["theme"])
 
 # Header (compact)
 st.markdown(f"""
-<div style='display:flex; align-items:center; gap:14px; margin: 0 0 0.7rem 0; padding: 0.7rem 0.9rem; background: {colors['card_bg']}; border-radius: 14px; border: 1px solid {colors['card_border']}; backdrop-filter: blur(8px); box-shadow: {colors['shadow']};'>
-<div style='width:48px; height:48px; border-radius:16px; 
-            background:radial-gradient(circle at 30% 10%, {colors['accent']}, #1d4ed8);
-            display:flex; align-items:center; justify-content:center; color:white; font-size:26px;
-            box-shadow: {colors['shadow']};'>
- 💻
-</div>
+<div class="app-header">
+<div class="app-logo">💻</div>
 <div>
-        <div style='font-weight:700; color:{colors['text_primary']}; font-size:1.25rem;'>Code Gen Ai</div>
-    <div style='font-size:0.8rem; opacity:0.85; color: {colors['text_secondary']};'>
-     Hey {user_name}, {role} mode is active. Pick what you want to do.
-    </div>
+    <div class="app-title">Code Gen Ai</div>
+    <div class="app-subtitle">Hey {user_name}, {role} mode is active. Pick what you want to do.</div>
 </div>
 </div>
 """, unsafe_allow_html=True)
@@ -810,58 +685,68 @@ chat_container = st.container()
 with chat_container:
     if not messages:
         st.markdown(
-            f"<div style='color:{colors['text_secondary']}; margin-top:0.8rem; text-align: center; font-size:0.9rem;'>Type a question or paste code below. Mode changes how Code Gen Ai responds.</div>",
+            "<div class='empty-hint'>Type a question or paste code below. Mode changes how Code Gen Ai responds.</div>",
             unsafe_allow_html=True,
         )
     else:
-        for msg in messages:
-            if msg["role"] == "user":
-                st.markdown(f"""
-                <div class="chat-message user-message">
-                    <div class="message-content">
-                        <div style="font-size: 0.7rem; opacity: 0.7; margin-bottom: 0.25rem; text-align: right;">
-                            You • {msg.get("timestamp", "now")}
-                        </div>
-                        <div style="white-space: pre-wrap;">{msg['content']}</div>
-                    </div>
-                    <div class="avatar" style="background: linear-gradient(135deg, {colors['accent']}, #1d4ed8); color: white;">
-                        👤
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            elif msg["role"] == "assistant":
-                st.markdown(f"""
-                <div class="chat-message assistant-message">
-                    <div class="avatar" style="background: linear-gradient(135deg, {colors['accent']}, #1d4ed8); color: white;">
-                        💻
-                    </div>
-                    <div class="message-content">
-                        <div style="font-size: 0.7rem; opacity: 0.7; margin-bottom: 0.25rem;">
-                            Code Gen Ai • {msg.get("timestamp", "now")}
-                        </div>
-                        <div style="white-space: pre-wrap;">{msg['content']}</div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+        window = active_thread.get("window", CHAT_RENDER_WINDOW)
+        if len(messages) > window or active_thread["has_more"]:
+            if st.button("Load earlier messages", key="load_earlier"):
+                active_thread["window"] = window + CHAT_RENDER_WINDOW
+                if active_thread["window"] > len(messages):
+                    load_earlier_messages(active_thread)
+                st.rerun()
+        theme = st.session_state.settings["theme"]
+        with STAGE_SECONDS.time(stage="render"):
+            st.markdown(transcript_html(messages[-window:], theme), unsafe_allow_html=True)
+    if st.session_state.settings.get("show_timings") and st.session_state.get("last_timings"):
+        st.caption(" · ".join(
+            f"{stage.replace('_', ' ')} {seconds * 1000:.0f} ms"
+            for stage, seconds in st.session_state.last_timings.items()
+        ))
+    mark_first_render()
+    if st.session_state.settings.get("show_timings"):
+        report = import_report()
+        if report["cold_start_seconds"] is not None:
+            loaded = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in report["imports"].items())
+            st.caption(f"cold start {report['cold_start_seconds'] * 1000:.0f} ms" + (f" · imports: {loaded}" if loaded else ""))
 
 
 # AI Response
 if st.session_state.get("processing", False) and st.session_state.get("last_prompt", ""):
     if "generating_response" not in st.session_state:
         st.session_state.generating_response = True
-
-        model = st.session_state.settings.get("model", "llama-3.1-8b-instant")
-        if model == "Mock Mode (Demo)":
-            answer = "**Mock Mode:** This is a demo response."
+        st.session_state.pop("batch_report", None)
+
+        model = st.session_state.settings.get("model", DEFAULT_MODEL)
+        # The pending user turn is sent as `last_prompt` (its file, if any, in file_context), not from history
+        history = active_thread["messages"]
+        if history and history[-1]["role"] == "user":
+            history = history[:-1]
+        file_context = st.session_state.pop("file_context", None)
+        engine = get_engine()
+        session_id, on_stage = current_session_id(), stage_recorder()
+        try:
+            with chat_container:
+                prompt, system = prepare_prompt(st.session_state.last_prompt, file_context, model)
+        except FileContextError as e:
+            answer = str(e)
         else:
-            with st.spinner("Code Gen Ai is thinking..."):
-                answer = call_groq_api(st.session_state.last_prompt, model)
+            if st.session_state.settings.get("stream", True) and model not in (AUTO_MODEL, MOCK_MODEL):
+                with chat_container:
+                    answer = render_streamed_answer(
+                        engine.stream(prompt, model, system, history, session_id, on_stage),
+                        st.empty(),
+                        colors,
+                    )
+            else:
+                with st.spinner("Code Gen Ai is thinking..."):
+                    answer, st.session_state.last_answer_model = engine.answer(
+                        prompt, model, system, history, session_id, on_stage
+                    )
 
-        active_thread["messages"].append({
-            "role": "assistant",
-            "content": answer,
-            "timestamp": datetime.now().strftime("%H:%M")
-        })
+        add_message(active_thread, "assistant", answer)
+        st.session_state.last_timings = st.session_state.pop("pending_timings", {})
 
         st.session_state.processing = False
         st.session_state.last_prompt = ""
@@ -883,7 +768,7 @@ if st.session_state.get("last_file_name"):
                 <div style="font-size: 0.75rem; opacity: 0.7;">{len(st.session_state.ocr_context.get("text", ""))} characters extracted</div>
             </div>
         </div>
-        <button onclick="document.getElementById('cancel_file').click()" style="background: transparent; border: none; color: {colors['text_secondary']}; cursor: pointer; font-size: 1rem;">✕</button>
+        <button onclick="document.getElementById('cancel_file').click()" class="file-preview-close">✕</button>
         <button id="cancel_file" style="display: none;"></button>
     </div>
     """, unsafe_allow_html=True)
@@ -921,12 +806,33 @@ if attach_clicked:
     st.session_state["show_uploader"] = True
 
 if st.session_state.get("show_uploader", False):
-    uploaded_quick = st.file_uploader(
+    batch_mode = st.toggle("Batch mode (many files)", key="batch_mode")
+    uploaded_quick = None if batch_mode else st.file_uploader(
         "Upload",
         type=["py", "txt", "png", "jpg", "jpeg", "pdf"],
         key="quick_upl",
         label_visibility="collapsed"
     )
+    if batch_mode:
+        uploaded_batch = st.file_uploader(
+            "Upload files",
+            type=["py", "txt", "png", "jpg", "jpeg", "pdf"],
+            accept_multiple_files=True,
+            key="batch_upl",
+            label_visibility="collapsed"
+        )
+        batch_question = st.text_input("Request for every file", value="Analyze this screenshot/code.", key="batch_question")
+        if uploaded_batch and st.button(f"▶ Run batch ({min(len(uploaded_batch), BATCH_MAX_FILES)} files)", key="run_batch"):
+            files = [(f.name, f.getvalue()) for f in uploaded_batch[:BATCH_MAX_FILES]]
+            add_message(active_thread, "user", f"📦 Batch of {len(files)} files: {batch_question}")
+            if len(active_thread["messages"]) <= 2:
+                rename_thread(active_thread["id"], generate_title(f"Batch: {batch_question}"))
+            report = run_batch_job(files, batch_question)
+            add_message(active_thread, "assistant", report)
+            st.session_state.batch_report = {"thread_id": active_thread["id"], "report": report}
+            st.session_state.last_timings = st.session_state.pop("pending_timings", {})
+            st.session_state["show_uploader"] = False
+            st.rerun()
     if uploaded_quick is not None:
         fname = uploaded_quick.name
         try:
@@ -934,15 +840,8 @@ if st.session_state.get("show_uploader", False):
 
             if is_image:
                 text = extract_text_from_image(uploaded_quick)
-            elif fname.lower().endswith(".pdf") and OCR_AVAILABLE:
-                text = ""
-                pages = convert_from_bytes(uploaded_quick.read())
-                for p in pages:
-                    text += pytesseract.image_to_string(p) + "\n"
-                text = " ".join(text.split())
             else:
-                text = uploaded_quick.read().decode("utf-8", errors="ignore")
-                text = " ".join(text.split())
+                text = extract_upload_text(fname, uploaded_quick.read())
 
             if text:
                 st.session_state.ocr_context = {
@@ -954,18 +853,12 @@ if st.session_state.get("show_uploader", False):
                 st.success(f"Attached {fname}. Type your question.")
 
                 if st.session_state.ocr_context.get("text"):
-                    mode = st.session_state.get("mode", "Debug code")
                     ocr_text = st.session_state.ocr_context["text"]
                     filename = st.session_state.ocr_context["filename"]
 
-                    auto_prompt = (
-                        f"{BASE_MODE_PROMPTS[mode]}\n\n"
-                        f"**Screenshot/File:** {filename} ({len(ocr_text)} chars extracted):\n"
-                        f"{ocr_text}\n\n"
-                        f"**TASK:** Analyze this screenshot/code."
-                    )
-
-                    st.session_state.last_prompt = auto_prompt
+                    # Engine.prepare_text wraps the question and the file with file_prompt
+                    st.session_state.last_prompt = "Analyze this screenshot/code."
+                    st.session_state.file_context = {"filename": filename, "text": ocr_text}
                     st.session_state.processing = True
 
         except Exception as e:
@@ -974,20 +867,55 @@ if st.session_state.get("show_uploader", False):
         st.session_state["show_uploader"] = False
         st.rerun()
 
+# Offered only under the batch that produced it, until the next prompt or thread switch
+batch_download = st.session_state.get("batch_report")
+if batch_download and batch_download["thread_id"] != active_thread["id"]:
+    st.session_state.pop("batch_report")
+elif batch_download:
+    st.download_button(
+        "⬇️ Download batch report",
+        batch_download["report"],
+        file_name=f"batch-report-{datetime.now().strftime('%Y%m%d-%H%M')}.md",
+        mime="text/markdown",
+    )
+
 
 # Mic Logic
 if mic_clicked:
-    spoken = recognize_speech()
-    if spoken:
-        mode = st.session_state.get("mode")
-        system_prefix = BASE_MODE_PROMPTS.get(mode, "")
-        final_prompt = f"{system_prefix}\n\nUser query:\n{spoken}"
-
-        active_thread["messages"].append({
-            "role": "user",
-            "content": spoken,
-            "timestamp": datetime.now().strftime("%H:%M")
-        })
+    listener = st.session_state.get("speech_listener")
+    if listener is not None and listener.active:
+        listener.cancel()
+        st.session_state.speech_listener = None
+    else:
+        try:
+            st.session_state.speech_listener = start_listening()
+        except Exception as e:
+            st.error(f"❌ Speech: {e}")
+
+
+@st.fragment(run_every=SPEECH_POLL_INTERVAL)
+def speech_status():
+    listener = st.session_state.get("speech_listener")
+    if listener is None:
+        return
+    if listener.active:
+        st.caption("🎙️ Listening... click 🎤 again to stop" if listener.state == "listening" else "📝 Transcribing...")
+    else:
+        st.rerun()
+
+
+listener = st.session_state.get("speech_listener")
+if listener is not None and listener.active:
+    speech_status()
+elif listener is not None:
+    st.session_state.speech_listener = None
+    spoken = listener.result
+    if listener.state == "error":
+        st.error(f"❌ Speech: {listener.error}")
+    elif spoken:
+        final_prompt = spoken
+
+        add_message(active_thread, "user", spoken)
 
         if len(active_thread["messages"]) <= 2:
             rename_thread(active_thread["id"], generate_title(spoken))
@@ -995,40 +923,30 @@ if mic_clicked:
         st.session_state.last_prompt = final_prompt
         st.session_state.processing = True
         st.rerun()
+    elif listener.state == "done":
+        st.warning("Didn't catch that, try again.")
 
 
 # Text Input Logic
 if user_input:
-    mode = st.session_state.get("mode")
-    system_prefix = BASE_MODE_PROMPTS.get(mode, "")
-
-    final_prompt = f"{system_prefix}\n\nUser query:\n{user_input}"
+    final_prompt = user_input
 
     if st.session_state.ocr_context.get("text"):
         ocr_text = st.session_state.ocr_context["text"]
         filename = st.session_state.ocr_context["filename"]
-        final_prompt = (
-            f"{system_prefix}\n\n"
-            f"**Screenshot/File:** {filename}\n"
-            f"**OCR Extracted Code/UI:**\n"
-            f"{ocr_text}\n\n"
-            f"**User Question:** {user_input}"
-        )
+        final_prompt = file_prompt(filename, ocr_text, user_input)
+        st.session_state.file_context = {"filename": filename, "text": ocr_text}
         st.session_state.ocr_context = {"text": None, "filename": None}
         st.session_state.last_file_name = None
 
     with st.expander(f"🔍 AI Prompt ({len(final_prompt)} chars)"):
         st.code(final_prompt, language="text")
 
-    active_thread["messages"].append({
-        "role": "user",
-        "content": user_input,
-        "timestamp": datetime.now().strftime("%H:%M")
-    })
+    add_message(active_thread, "user", user_input)
 
     if len(active_thread["messages"]) <= 2:
         rename_thread(active_thread["id"], generate_title(user_input))
 
-    st.session_state.last_prompt = final_prompt
+    st.session_state.last_prompt = user_input
     st.session_state.processing = True
     st.rerun()
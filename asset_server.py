@@ -0,0 +1,41 @@
+"""Tiny HTTP server for the generated stylesheets, with long-lived browser caching."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from theme import all_stylesheets
+
+CONTENT_TYPES = {".css": "text/css; charset=utf-8"}
+
+
+def start_asset_server(port, host="127.0.0.1", assets=None):
+    """Serve {file name: text} at /static/<file name>. Names are content-hashed, so responses are immutable."""
+    files = {name: body.encode("utf-8") for name, body in (assets or all_stylesheets()).items()}
+
+    class AssetHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            name = path[len("/static/"):] if path.startswith("/static/") else None
+            body = files.get(name)
+            if body is None:
+                self.send_error(404)
+                return
+            etag = f'"{name}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPES.get(name[name.rfind("."):], "application/octet-stream"))
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), AssetHandler)
+    threading.Thread(target=server.serve_forever, name="assets", daemon=True).start()
+    return server
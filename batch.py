@@ -0,0 +1,65 @@
+"""Batch jobs over many uploaded files: concurrent extraction feeding a bounded pool of LLM requests."""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from routing import check_answer
+
+
+def run_batch(files, extract, answer, extract_workers=4, answer_workers=4):
+    """Yield one result dict per file, in completion order.
+
+    files: [(name, bytes)]; extract(name, data) -> text; answer(name, text) -> str.
+    A file's LLM request starts as soon as its own extraction finishes, so OCR and generation overlap.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=extract_workers) as extract_pool, \
+            ThreadPoolExecutor(max_workers=answer_workers) as answer_pool:
+        pending = {
+            extract_pool.submit(extract, name, data): (index, name, None)
+            for index, (name, data) in enumerate(files)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, name, text = pending.pop(future)
+                result = {"index": index, "filename": name, "chars": 0, "answer": None, "error": None}
+                try:
+                    value = future.result()
+                except Exception as e:
+                    result["error"] = f"{'Could not read' if text is None else 'Request failed for'} {name}: {e}"
+                    result["chars"] = len(text or "")
+                    result["seconds"] = time.perf_counter() - started
+                    yield result
+                    continue
+                if text is None:
+                    if not value.strip():
+                        result["error"] = f"No text extracted from {name}"
+                        result["seconds"] = time.perf_counter() - started
+                        yield result
+                        continue
+                    pending[answer_pool.submit(answer, name, value)] = (index, name, value)
+                    continue
+                result["chars"] = len(text)
+                if check_answer(value) == "error":
+                    # Providers report failures as "<Provider> Error: ..." answers
+                    result["error"] = f"Request failed for {name}: {value}"
+                else:
+                    result["answer"] = value
+                result["seconds"] = time.perf_counter() - started
+                yield result
+
+
+def batch_report(results, question, title="Batch report"):
+    """Markdown with one section per file, in upload order."""
+    lines = [f"# {title}", "", f"**Request:** {question}", "", f"**Files:** {len(results)}", ""]
+    for result in sorted(results, key=lambda r: r["index"]):
+        lines.append(f"## {result['filename']}")
+        lines.append("")
+        if result["error"]:
+            lines.append(f"⚠️ {result['error']}")
+        else:
+            lines.append(f"_{result['chars']} characters, done after {result['seconds']:.1f}s_")
+            lines.append("")
+            lines.append(result["answer"] or "")
+        lines.append("")
+    return "\n".join(lines)
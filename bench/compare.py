@@ -0,0 +1,50 @@
+"""Compare two bench.run JSON reports and flag regressions.
+
+    python -m bench.compare baseline.json candidate.json --threshold 1.2
+
+Exits 1 if any p50/p95 latency in the candidate is more than `threshold` times the baseline.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ("p50_ms", "p95_ms")
+
+
+def flatten(node, prefix=""):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, node
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = dict(flatten(json.load(f)["results"]))
+    with open(args.candidate) as f:
+        candidate = dict(flatten(json.load(f)["results"]))
+
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys()):
+        if not key.endswith(LATENCY_KEYS):
+            continue
+        before, after = baseline[key], candidate[key]
+        ratio = after / before if before else float("inf") if after else 1.0
+        flag = ""
+        if ratio > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:70s} {before:10.3f} -> {after:10.3f} ms  x{ratio:.2f}{flag}")
+    print(f"{regressions} regression(s) above x{args.threshold}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
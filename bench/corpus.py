@@ -0,0 +1,87 @@
+"""Deterministic OCR benchmark corpus: code screenshots and multi-page PDFs rendered with Pillow.
+
+Generated on first use into bench/.corpus so no binaries live in the repo.
+"""
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), ".corpus")
+
+CODE_SAMPLE = '''def merge_intervals(intervals):
+    intervals.sort(key=lambda pair: pair[0])
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class LRUCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = {}
+
+    def get(self, key):
+        if key not in self.items:
+            return -1
+        value = self.items.pop(key)
+        self.items[key] = value
+        return value
+
+Traceback (most recent call last):
+  File "main.py", line 42, in <module>
+    print(merge_intervals(None))
+TypeError: 'NoneType' object has no attribute 'sort'
+'''
+
+# name -> (width, height, font size, dark theme)
+SCREENSHOTS = {
+    "screenshot_1080p_light.png": (1920, 1080, 22, False),
+    "screenshot_1080p_dark.png": (1920, 1080, 22, True),
+    "screenshot_4k_dark.png": (3840, 2160, 40, True),
+}
+# name -> page count; pages are A4 at 150 DPI
+PDFS = {
+    "spec_5_pages.pdf": 5,
+    "spec_20_pages.pdf": 20,
+}
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has a single bitmap font
+        return ImageFont.load_default()
+
+
+def render_code(width, height, font_size, dark, text=CODE_SAMPLE):
+    background, foreground = ((30, 30, 30), (212, 212, 212)) if dark else ((255, 255, 255), (20, 20, 20))
+    image = Image.new("RGB", (width, height), background)
+    draw = ImageDraw.Draw(image)
+    font = _font(font_size)
+    y = font_size
+    for line in text.splitlines():
+        draw.text((font_size * 2, y), line, fill=foreground, font=font)
+        y += int(font_size * 1.4)
+        if y > height - font_size:
+            break
+    return image
+
+
+def ensure_corpus():
+    """Create any missing corpus files; returns {name: path}."""
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    paths = {}
+    for name, (width, height, font_size, dark) in SCREENSHOTS.items():
+        path = paths[name] = os.path.join(CORPUS_DIR, name)
+        if not os.path.exists(path):
+            render_code(width, height, font_size, dark).save(path)
+    for name, page_count in PDFS.items():
+        path = paths[name] = os.path.join(CORPUS_DIR, name)
+        if not os.path.exists(path):
+            pages = [render_code(1240, 1754, 24, False) for _ in range(page_count)]
+            pages[0].save(path, save_all=True, append_images=pages[1:], resolution=150)
+    return paths
@@ -0,0 +1,112 @@
+"""Stand-in for a local Ollama server, for exercising OllamaProvider without a model.
+
+    python -m bench.mock_ollama --port 11434 --token-delay 0.01
+    LLM_PROVIDER=ollama OLLAMA_URL=http://localhost:11434 streamlit run app.py
+
+/api/chat echoes the last user message back, word by word when streaming. Every request body
+is appended to `handler.requests`. `fail_status` answers /api/chat with that HTTP status, and
+`error_after` ends a stream with an in-band {"error": ...} line after that many words, as Ollama
+does when the runner dies mid-generation.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(token_delay=0.0, models=("llama3.1:8b", "llama3.3:70b"), fail_status=None, error_after=None):
+    class MockOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+        requests = []
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json(200, {"models": [{"name": m, "model": m} for m in models]})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/api/chat":
+                self._send_json(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            self.requests.append(request)
+            if fail_status:
+                self._send_json(fail_status, {"error": "mock failure"})
+                return
+            model = request.get("model", "")
+            if model not in models:
+                self._send_json(404, {"error": f"model '{model}' not found"})
+                return
+            user_turns = [m["content"] for m in request.get("messages", []) if m.get("role") == "user"]
+            reply = f"Echo: {user_turns[-1] if user_turns else ''}"
+            prompt_tokens = sum(len(m.get("content", "")) // 4 for m in request.get("messages", []))
+            words = reply.split(" ")
+            done = {
+                "model": model,
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": len(words),
+            }
+
+            if not request.get("stream", True):
+                time.sleep(token_delay * len(words))
+                done["message"]["content"] = reply
+                self._send_json(200, done)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, word in enumerate(words):
+                if error_after is not None and i == error_after:
+                    self._write_chunk({"error": "model runner has unexpectedly stopped"})
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+                time.sleep(token_delay)
+                piece = word if i == 0 else " " + word
+                self._write_chunk({"model": model, "message": {"role": "assistant", "content": piece}, "done": False})
+            self._write_chunk(done)
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, body):
+            line = json.dumps(body).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+            self.wfile.flush()
+
+    return MockOllamaHandler
+
+
+def start_server(port=0, token_delay=0.0, **options):
+    """Start in a background thread; returns (server, base_url). Port 0 picks a free one.
+
+    options go to make_handler; the handler class (and its request log) is server.RequestHandlerClass.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(token_delay, **options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed words")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.token_delay))
+    print(f"Mock Ollama listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
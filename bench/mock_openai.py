@@ -0,0 +1,116 @@
+"""OpenAI/Groq-compatible chat completions stand-in with configurable latency and token rate.
+
+    python -m bench.mock_openai --port 8088 --latency 0.3 --tokens-per-second 250
+    GROQ_BASE_URL=http://127.0.0.1:8088 GROQ_API_KEY=bench streamlit run app.py
+
+Serves POST /openai/v1/chat/completions (the Groq SDK path) and /v1/chat/completions,
+streaming (SSE) or not. Every reply is `--completion-tokens` copies of a short word.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency=0.2, tokens_per_second=200.0, completion_tokens=200):
+    class MockOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if self.path not in ("/openai/v1/chat/completions", "/v1/chat/completions"):
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            model = request.get("model", "mock")
+            n_tokens = min(completion_tokens, request.get("max_tokens") or completion_tokens)
+            prompt_tokens = sum(len(m.get("content", "")) // 4 for m in request.get("messages", []))
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            created = int(time.time())
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": n_tokens,
+                "total_tokens": prompt_tokens + n_tokens,
+            }
+
+            time.sleep(latency)
+            if not request.get("stream"):
+                time.sleep(n_tokens / tokens_per_second)
+                body = json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(["tok"] * n_tokens)},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(n_tokens):
+                if i:
+                    time.sleep(1.0 / tokens_per_second)
+                self._event({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": "tok" if i == 0 else " tok"}, "finish_reason": None}],
+                })
+            self._event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _event(self, body):
+            self._write_chunk(b"data: " + json.dumps(body).encode("utf-8") + b"\n\n")
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return MockOpenAIHandler
+
+
+def start_server(port=0, **options):
+    """Start in a background thread; returns (server, base_url). Port 0 picks a free one."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(**options))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    args = parser.parse_args()
+    handler = make_handler(args.latency, args.tokens_per_second, args.completion_tokens)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"Mock OpenAI-compatible server on http://127.0.0.1:{args.port}")
+    server.serve_forever()
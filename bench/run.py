@@ -0,0 +1,253 @@
+"""Benchmark harness. Run from the repo root:
+
+    python -m bench.run                       # all suites, JSON to bench/results/
+    python -m bench.run --suites prompt render --output before.json
+    python -m bench.compare before.json after.json
+
+Suites:
+  prompt  build_chat_messages over 10/100/1000-message histories (cold and memoized)
+  render  transcript_html over 10/100/1000 messages (cold and cached)
+  ocr     screenshots (raw vs preprocessed) and PDFs (streaming vs parallel); needs tesseract/poppler
+  e2e     Engine.stream (the app's LLM path) against bench.mock_openai under concurrent load
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+SIZES = (10, 100, 1000)
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def repeat(fn, times, setup=None):
+    samples = []
+    for _ in range(times):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def make_history(n):
+    answer = "Here is the fix:\n```python\n" + "def solve(values):\n    return sorted(set(values))\n" * 8 + "```\n"
+    return [
+        {
+            "id": i,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Question {i}: why does this fail?\n" + "x = compute(y)\n" * 5 if i % 2 == 0 else answer,
+            "timestamp": "12:00",
+        }
+        for i in range(n)
+    ]
+
+
+def bench_prompt(args):
+    from chat_context import build_chat_messages
+
+    results = {}
+    for n in SIZES:
+        base = make_history(n)
+        fresh = lambda: [dict(m) for m in base]
+        warm = fresh()
+        build_chat_messages("next question", "system prompt", warm)
+        results[str(n)] = {
+            "cold": repeat(lambda h: build_chat_messages("next question", "system prompt", h), args.repeat, fresh),
+            "memoized": repeat(lambda _: build_chat_messages("next question", "system prompt", warm), args.repeat),
+        }
+    return results
+
+
+def bench_render(args):
+    from transcript import HTML_CACHE, transcript_html
+
+    results = {}
+    for n in SIZES:
+        history = make_history(n)
+
+        def cold(_):
+            HTML_CACHE.clear()
+            transcript_html(history, "Dark")
+
+        transcript_html(history, "Dark")
+        results[str(n)] = {
+            "cold": repeat(cold, args.repeat),
+            "cached": repeat(lambda _: transcript_html(history, "Dark"), args.repeat),
+            "html_bytes": len(transcript_html(history, "Dark").encode("utf-8")),
+        }
+    return results
+
+
+def bench_ocr(args):
+    try:
+        import pytesseract
+        from PIL import Image
+
+        pytesseract.get_tesseract_version()
+        from ocr_preprocess import preprocess_for_ocr
+        from pdf_ocr import create_ocr_pool, ocr_pdf_parallel, ocr_pdf_streaming
+    except Exception as e:
+        return {"skipped": f"OCR stack unavailable: {e}"}
+    from bench.corpus import PDFS, SCREENSHOTS, ensure_corpus
+
+    paths = ensure_corpus()
+    results = {}
+    for name in SCREENSHOTS:
+        image = Image.open(paths[name])
+        image.load()
+        results[name] = {
+            "raw": repeat(lambda _: pytesseract.image_to_string(image), args.ocr_repeat),
+            "preprocessed": repeat(lambda _: pytesseract.image_to_string(preprocess_for_ocr(image)), args.ocr_repeat),
+        }
+    pool = create_ocr_pool(args.ocr_workers)
+    try:
+        for name in PDFS:
+            with open(paths[name], "rb") as f:
+                data = f.read()
+            results[name] = {
+                "streaming": repeat(lambda _: ocr_pdf_streaming(data), args.ocr_repeat),
+                "parallel": repeat(lambda _: ocr_pdf_parallel(data, pool), args.ocr_repeat),
+            }
+    finally:
+        pool.shutdown()
+    return results
+
+
+def bench_e2e(args):
+    from dataclasses import replace
+
+    from bench.mock_openai import start_server
+    from engine import Engine, EngineConfig
+    from routing import check_answer
+
+    server, base_url = start_server(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+    )
+    # The shipped path: prompt packing, response cache, single-flight, scheduler limits and retries.
+    # Everything else comes from the environment, as in the app.
+    config = EngineConfig.from_env()
+    config = replace(
+        config,
+        llm_provider="groq",
+        groq_api_key="bench",
+        groq_base_url=base_url,
+        groq_max_connections=max(config.groq_max_connections, args.concurrency * 2),
+        max_tokens=args.completion_tokens,
+        model_limits={
+            **config.model_limits,
+            args.model: {"concurrency": args.concurrency, "rpm": args.rpm, "tpm": args.tpm},
+        },
+    )
+    engine = Engine(config)
+    history = make_history(20)
+    ttft, total, errors = [], [], []
+    lock = threading.Lock()
+
+    def one_request(i):
+        started = time.perf_counter()
+        first = None
+        parts = []
+        # A different prompt per request, so the response cache and single-flight never short-circuit
+        prompt = f"Explain this code (request {i})"
+        for delta in engine.stream(prompt, args.model, "You are a teacher.", history, f"session-{i % args.concurrency}"):
+            if first is None:
+                first = time.perf_counter() - started
+            parts.append(delta)
+        answer = "".join(parts)
+        with lock:
+            if check_answer(answer) == "error":
+                errors.append(answer)
+                return
+            ttft.append(first or 0.0)
+            total.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=one_request, args=(i,)) for i in range(args.requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    cache = engine.response_cache.stats()
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "errors": len(errors),
+        "cache_hits": cache["memory_hits"] + cache["disk_hits"],
+        "coalesced": engine.inflight.coalesced + engine.stream_flights.coalesced,
+        "time_to_first_token": summarize(ttft) if ttft else None,
+        "total": summarize(total) if total else None,
+        "requests_per_second": round(len(total) / elapsed, 3),
+        "tokens_per_second": round(len(total) * args.completion_tokens / elapsed, 1),
+    }
+
+
+SUITES = {"prompt": bench_prompt, "render": bench_render, "ocr": bench_ocr, "e2e": bench_e2e}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", nargs="+", choices=sorted(SUITES), default=list(SUITES))
+    parser.add_argument("--output", help="JSON path (default bench/results/<time>-<commit>.json)")
+    parser.add_argument("--repeat", type=int, default=50, help="iterations for micro-benchmarks")
+    parser.add_argument("--ocr-repeat", type=int, default=3)
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--requests", type=int, default=100, help="e2e requests")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock server seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--completion-tokens", type=int, default=100)
+    parser.add_argument("--model", default="mock", help="e2e model id; its limits come from the flags below")
+    parser.add_argument("--rpm", type=int, default=10 ** 6, help="e2e requests per minute limit")
+    parser.add_argument("--tpm", type=int, default=10 ** 9, help="e2e tokens per minute limit")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": {},
+    }
+    for name in args.suites:
+        print(f"running {name}...", file=sys.stderr)
+        report["results"][name] = SUITES[name](args)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{report['commit'] or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+MESSAGE_TOKEN_OVERHEAD = 4  # role + separators per chat message
+
+
+def count_tokens(text: str) -> int:
+    # ~4 characters per token holds well enough for English and code with Llama/Qwen tokenizers
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message) -> int:
+    # Counted once per message and memoized on the dict, so packing each turn is O(packed)
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = message["tokens"] = count_tokens(message["content"]) + MESSAGE_TOKEN_OVERHEAD
+    return tokens
+
+
+def pack_history(history, budget: int):
+    packed = []
+    used = 0
+    for message in reversed(history):
+        if message["role"] not in ("user", "assistant"):
+            continue
+        cost = message_tokens(message)
+        if used + cost > budget:
+            break
+        packed.append({"role": message["role"], "content": message["content"]})
+        used += cost
+    packed.reverse()
+    return packed
+
+
+def build_chat_messages(prompt: str, system: str = "", history=None, budget: int = 6000):
+    remaining = budget - count_tokens(prompt) - MESSAGE_TOKEN_OVERHEAD
+    chat_messages = []
+    if system:
+        chat_messages.append({"role": "system", "content": system})
+        remaining -= count_tokens(system) + MESSAGE_TOKEN_OVERHEAD
+    chat_messages.extend(pack_history(history or [], max(remaining, 0)))
+    chat_messages.append({"role": "user", "content": prompt})
+    return chat_messages
@@ -0,0 +1,121 @@
+"""Command-line entry point on the same engine as the Streamlit UI.
+
+    python cli.py generate "Why does this crash?" --mode "Debug code" --file bug.py
+    python cli.py generate "Review these" --mode "Explain code" --file a.py --file b.py --report review.md
+    python cli.py ocr screenshot.png scan.pdf
+    python cli.py serve --port 8600
+
+generate exits 1 if any answer is an LLM error, so CI jobs can fail on it.
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from batch import batch_report, run_batch
+from engine import AUTO_MODEL, BASE_MODE_PROMPTS, DEFAULT_MODEL, Engine, EngineConfig, file_prompt
+from file_context import FileContextError
+from routing import check_answer
+
+
+def read_prompt(args):
+    if args.prompt == "-" or (args.prompt is None and not sys.stdin.isatty()):
+        return sys.stdin.read()
+    return args.prompt or "Analyze this screenshot/code."
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return os.path.basename(path), f.read()
+
+
+def cmd_generate(engine, args):
+    question = read_prompt(args)
+    if len(args.file) > 1:
+        return generate_batch(engine, args, question)
+    file = read_file(args.file[0]) if args.file else None
+    try:
+        result = engine.generate(question, mode=args.mode, model=args.model, file=file, stream=args.stream)
+    except FileContextError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if isinstance(result, str):
+        print(result)
+        return 1 if check_answer(result) == "error" else 0
+    parts = []
+    for delta in result:
+        parts.append(delta)
+        print(delta, end="", flush=True)
+    print()
+    return 1 if check_answer("".join(parts)) == "error" else 0
+
+
+def generate_batch(engine, args, question):
+    system = BASE_MODE_PROMPTS.get(args.mode, "")
+
+    def answer(name, text):
+        prompt = engine.budget_prompt(file_prompt(name, text, question), name, text, question, args.model)
+        return engine.answer(prompt, args.model, system)[0]
+
+    results = []
+    for result in run_batch([read_file(p) for p in args.file], engine.extract_file_text, answer,
+                            extract_workers=args.workers, answer_workers=args.workers):
+        results.append(result)
+        print(f"[{len(results)}/{len(args.file)}] {result['filename']}: {'error' if result['error'] else 'done'}",
+              file=sys.stderr)
+    report = batch_report(results, question)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+    return 1 if any(r["error"] for r in results) else 0
+
+
+def cmd_ocr(engine, args):
+    for path in args.paths:
+        name, data = read_file(path)
+        if len(args.paths) > 1:
+            print(f"==> {name} <==")
+        print(engine.extract_file_text(name, data))
+    return 0
+
+
+def cmd_serve(engine, args):
+    import server
+
+    server.run(engine, args.host, args.port, args.concurrency)
+    return 0
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="answer one prompt, optionally about one or more files")
+    generate.add_argument("prompt", nargs="?", help='question text, or "-" to read stdin')
+    generate.add_argument("--mode", choices=sorted(BASE_MODE_PROMPTS), help="system prompt, as in the UI")
+    generate.add_argument("--model", default=DEFAULT_MODEL, help=f'model id, or "{AUTO_MODEL}"')
+    generate.add_argument("--file", action="append", default=[], help="repeat for a batch report")
+    generate.add_argument("--stream", action="store_true")
+    generate.add_argument("--report", help="batch report path (default stdout)")
+    generate.add_argument("--workers", type=int, default=4, help="concurrent files in a batch")
+
+    ocr = commands.add_parser("ocr", help="print extracted text for images, PDFs or text files")
+    ocr.add_argument("paths", nargs="+")
+
+    serve = commands.add_parser("serve", help="run the HTTP API (see server.py)")
+    serve.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    serve.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8600")))
+    serve.add_argument("--concurrency", type=int, default=int(os.getenv("API_CONCURRENCY", "16")))
+
+    args = parser.parse_args(argv)
+    engine = Engine(EngineConfig.from_env())
+    handler = {"generate": cmd_generate, "ocr": cmd_ocr, "serve": cmd_serve}[args.command]
+    return handler(engine, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
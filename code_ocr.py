@@ -0,0 +1,83 @@
+"""Layout-preserving OCR for code: rebuild lines and indentation from Tesseract's word boxes."""
+import statistics
+
+from lazy_imports import lazy_import
+
+# psm 6 reads the image as one uniform block, which keeps source lines intact
+CODE_OCR_CONFIG = "--psm 6 -c preserve_interword_spaces=1"
+MAX_BLANK_LINES = 2
+
+
+def normalize_whitespace(text: str) -> str:
+    """Compact single-line form, used when layout is off or the layout pass found no text."""
+    return " ".join(text.split())
+
+
+def _lines(data):
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        if not word or float(data["conf"][i]) < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append({
+            "text": word,
+            "left": data["left"][i],
+            "top": data["top"][i],
+            "width": data["width"][i],
+            "height": data["height"][i],
+        })
+    ordered = [sorted(words, key=lambda w: w["left"]) for words in lines.values()]
+    return sorted(ordered, key=lambda words: min(w["top"] for w in words))
+
+
+def _indent_unit(columns):
+    steps = sorted({c for c in columns if c > 0})
+    return steps[0] if steps and steps[0] >= 2 else 1
+
+
+def layout_from_data(data) -> str:
+    """Rebuild text from pytesseract.image_to_data(..., output_type=Output.DICT).
+
+    Leading indentation and gaps between words become spaces measured in character widths,
+    large vertical gaps become blank lines, and the blank margin around the code is trimmed.
+    """
+    lines = _lines(data)
+    if not lines:
+        return ""
+    words = [w for line in lines for w in line]
+    char_width = statistics.median(w["width"] / len(w["text"]) for w in words) or 1
+    line_height = statistics.median(w["height"] for w in words) or 1
+    margin = min(line[0]["left"] for line in lines)
+
+    columns = [round((line[0]["left"] - margin) / char_width) for line in lines]
+    unit = _indent_unit(columns)
+    out = []
+    previous_bottom = None
+    for line, column in zip(lines, columns):
+        top = min(w["top"] for w in line)
+        if previous_bottom is not None:
+            gap_lines = round((top - previous_bottom) / (line_height * 1.5))
+            out.extend([""] * min(gap_lines, MAX_BLANK_LINES))
+        previous_bottom = max(w["top"] + w["height"] for w in line)
+
+        parts = [" " * (round(column / unit) * unit)]
+        for i, word in enumerate(line):
+            if i:
+                previous = line[i - 1]
+                gap = word["left"] - (previous["left"] + previous["width"])
+                parts.append(" " * max(1, round(gap / char_width)))
+            parts.append(word["text"])
+        out.append("".join(parts).rstrip())
+    return "\n".join(out).strip("\n")
+
+
+def image_to_code(image, lang="eng", config=""):
+    pytesseract = lazy_import("pytesseract")
+    data = pytesseract.image_to_data(
+        image,
+        lang=lang,
+        config=f"{CODE_OCR_CONFIG} {config}".strip(),
+        output_type=pytesseract.Output.DICT,
+    )
+    return layout_from_data(data)
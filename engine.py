@@ -0,0 +1,524 @@
+"""The generation pipeline without Streamlit: mode prompts, OCR, prompt assembly and LLM calls.
+
+app.py, cli.py and server.py all drive one Engine per process:
+
+    engine = Engine(EngineConfig.from_env())
+    engine.generate("Why does this crash?", mode="Debug code", file=("bug.py", data))
+
+Per-request state (session id for fair scheduling, a per-prompt timings callback) is passed in
+by the caller; everything else (provider, caches, scheduler, OCR pool) is shared.
+"""
+import io
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from importlib.util import find_spec
+
+from chat_context import MESSAGE_TOKEN_OVERHEAD, build_chat_messages, count_tokens
+from code_ocr import normalize_whitespace
+from file_context import MAP_SYSTEM, budget_file_prompt
+from lazy_imports import lazy_import
+from metrics import LLM_REQUESTS, LLM_TOKENS, STAGE_SECONDS
+from ocr_cache import OCRCache
+from providers import GroqProvider, OllamaProvider
+from response_cache import ResponseCache
+from routing import AUTO_MODEL_TIERS, RoutingStats, check_answer
+from scheduler import ModelLimits, RequestScheduler, backoff_delay
+from singleflight import SingleFlight, StreamFlight
+
+# ---------- Mode prompts ----------
+BASE_MODE_PROMPTS = {
+    "Debug code": "You are a senior debugging assistant. Find and fix bugs in this code.",
+    "Solve problem": "You are a competitive programming expert. Solve the following problem with explanation and code.",
+    "Explain code": "You are a teacher. Explain what this code does step by step in simple language.",
+    "Practise code": "You are a coding coach. Give small practice tasks and solutions based on the topic.",
+    "Learn new technology": "You are a technology mentor. Explain and guide the user to learn new tools, frameworks, or technologies with practical examples.",
+}
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+AUTO_MODEL = "Auto (small model first)"
+MOCK_MODEL = "Mock Mode (Demo)"
+MOCK_ANSWER = "**Mock Mode:** This is a demo response."
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
+
+# Defaults follow Groq's published per-model RPM/TPM; override with GROQ_MODEL_LIMITS, e.g.
+# {"llama-3.3-70b-versatile": {"concurrency": 4, "rpm": 1000, "tpm": 300000}}
+DEFAULT_MODEL_LIMITS = {
+    "llama-3.1-8b-instant": {"rpm": 30, "tpm": 6000},
+    "llama-3.3-70b-versatile": {"rpm": 30, "tpm": 12000},
+    "qwen/qwen3-32b": {"rpm": 60, "tpm": 6000},
+    "meta-llama/llama-4-scout-17b-16e-instruct": {"rpm": 30, "tpm": 30000},
+}
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+def _env_flag(name, default):
+    return os.getenv(name, "1" if default else "0") == "1"
+
+
+@dataclass
+class EngineConfig:
+    # LLM
+    llm_provider: str = "groq"  # "groq" or "ollama"
+    groq_api_key: str = None
+    groq_base_url: str = None  # e.g. a local mock server for load tests
+    groq_max_connections: int = 100
+    groq_max_keepalive: int = 20
+    groq_keepalive_expiry: float = 30.0
+    groq_connect_timeout: float = 5.0
+    groq_read_timeout: float = 60.0
+    # Retries are done by the request scheduler so they are rate-limit aware; keep the SDK's off
+    groq_max_retries: int = 0
+    ollama_url: str = "http://localhost:11434"
+    ollama_keep_alive: str = "30m"
+    ollama_models: list = field(default_factory=lambda: ["llama3.1:8b", "llama3.3:70b"])
+    ollama_concurrency: int = 2
+    temperature: float = 0.7
+    max_tokens: int = 4000
+    model_concurrency: int = 8
+    model_limits: dict = field(default_factory=dict)
+    request_retries: int = 4
+    completion_token_estimate: int = 800
+    context_token_budget: int = 6000
+    # Response cache
+    response_cache_entries: int = 1024
+    response_cache_ttl: int = 3600
+    response_cache_dir: str = None  # None = memory only
+    response_cache_disk_max_bytes: int = 64 * 1024 * 1024
+    response_cache_near_duplicates: bool = False
+    # OCR
+    tesseract_cmd: str = None
+    ocr_lang: str = "eng"
+    ocr_config: str = ""
+    ocr_cache_entries: int = 256
+    ocr_cache_dir: str = None
+    ocr_cache_disk_max_bytes: int = 256 * 1024 * 1024
+    ocr_preprocess: bool = True
+    ocr_workers: int = os.cpu_count() or 1
+    ocr_pdf_dpi: int = 200
+    ocr_pdf_grayscale: bool = True
+    ocr_pdf_window: int = 1  # pages rasterized at once when ocr_workers=1
+    ocr_code_layout: bool = True  # rebuild lines/indentation instead of collapsing whitespace
+    # Large file context
+    file_context_tokens: int = 3000
+    file_chunk_tokens: int = 2000
+    file_map_workers: int = 4
+
+    @classmethod
+    def from_env(cls):
+        tesseract_cmd = os.getenv("TESSERACT_CMD")
+        if not tesseract_cmd and sys.platform.startswith("win"):
+            tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+        return cls(
+            llm_provider=os.getenv("LLM_PROVIDER", "groq").lower(),
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            groq_base_url=os.getenv("GROQ_BASE_URL"),
+            groq_max_connections=_env_int("GROQ_MAX_CONNECTIONS", 100),
+            groq_max_keepalive=_env_int("GROQ_MAX_KEEPALIVE", 20),
+            groq_keepalive_expiry=_env_float("GROQ_KEEPALIVE_EXPIRY", 30),
+            groq_connect_timeout=_env_float("GROQ_CONNECT_TIMEOUT", 5),
+            groq_read_timeout=_env_float("GROQ_READ_TIMEOUT", 60),
+            groq_max_retries=_env_int("GROQ_MAX_RETRIES", 0),
+            ollama_url=os.getenv("OLLAMA_URL", "http://localhost:11434"),
+            ollama_keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            ollama_models=[m.strip() for m in os.getenv("OLLAMA_MODELS", "llama3.1:8b,llama3.3:70b").split(",") if m.strip()],
+            ollama_concurrency=_env_int("OLLAMA_CONCURRENCY", 2),
+            model_concurrency=_env_int("GROQ_MODEL_CONCURRENCY", 8),
+            model_limits=json.loads(os.getenv("GROQ_MODEL_LIMITS", "{}")),
+            request_retries=_env_int("GROQ_REQUEST_RETRIES", 4),
+            completion_token_estimate=_env_int("COMPLETION_TOKEN_ESTIMATE", 800),
+            context_token_budget=_env_int("CONTEXT_TOKEN_BUDGET", 6000),
+            response_cache_entries=_env_int("RESPONSE_CACHE_ENTRIES", 1024),
+            response_cache_ttl=_env_int("RESPONSE_CACHE_TTL", 3600),
+            response_cache_dir=os.getenv("RESPONSE_CACHE_DIR"),
+            response_cache_disk_max_bytes=_env_int("RESPONSE_CACHE_DISK_MAX_BYTES", 64 * 1024 * 1024),
+            response_cache_near_duplicates=_env_flag("RESPONSE_CACHE_NEAR_DUPLICATES", False),
+            tesseract_cmd=tesseract_cmd,
+            ocr_lang=os.getenv("OCR_LANG", "eng"),
+            ocr_config=os.getenv("OCR_CONFIG", ""),
+            ocr_cache_entries=_env_int("OCR_CACHE_ENTRIES", 256),
+            ocr_cache_dir=os.getenv("OCR_CACHE_DIR"),
+            ocr_cache_disk_max_bytes=_env_int("OCR_CACHE_DISK_MAX_BYTES", 256 * 1024 * 1024),
+            ocr_preprocess=_env_flag("OCR_PREPROCESS", True),
+            ocr_workers=_env_int("OCR_WORKERS", os.cpu_count() or 1),
+            ocr_pdf_dpi=_env_int("OCR_PDF_DPI", 200),
+            ocr_pdf_grayscale=_env_flag("OCR_PDF_GRAYSCALE", True),
+            ocr_pdf_window=_env_int("OCR_PDF_WINDOW", 1),
+            ocr_code_layout=_env_flag("OCR_CODE_LAYOUT", True),
+            file_context_tokens=_env_int("FILE_CONTEXT_TOKENS", 3000),
+            file_chunk_tokens=_env_int("FILE_CHUNK_TOKENS", 2000),
+            file_map_workers=_env_int("FILE_MAP_WORKERS", 4),
+        )
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def extracted_block(text: str) -> str:
+    return f"```\n{text}\n```" if "\n" in text else text
+
+
+def file_prompt(filename, text, question):
+    return (
+        f"**Screenshot/File:** {filename}\n"
+        f"**OCR Extracted Code/UI:**\n"
+        f"{extracted_block(text)}\n\n"
+        f"**User Question:** {question}"
+    )
+
+
+class Engine:
+    def __init__(self, config: EngineConfig = None):
+        self.config = config or EngineConfig.from_env()
+        c = self.config
+        self.response_cache = ResponseCache(
+            max_entries=c.response_cache_entries,
+            ttl=c.response_cache_ttl,
+            disk_dir=c.response_cache_dir,
+            disk_max_bytes=c.response_cache_disk_max_bytes,
+            near_duplicates=c.response_cache_near_duplicates,
+        )
+        self.ocr_cache = OCRCache(
+            max_entries=c.ocr_cache_entries,
+            disk_dir=c.ocr_cache_dir,
+            disk_max_bytes=c.ocr_cache_disk_max_bytes,
+        )
+        self.scheduler = self._create_scheduler()
+        self.model_tiers = c.ollama_models if c.llm_provider == "ollama" else AUTO_MODEL_TIERS
+        self.routing_stats = RoutingStats(self.model_tiers)
+        self.inflight = SingleFlight()
+        self.stream_flights = StreamFlight()
+        self._provider = None
+        self._ocr_pool = None
+        self._lock = threading.Lock()
+
+    # ---------- Resources ----------
+    def _create_scheduler(self):
+        c = self.config
+        if c.llm_provider == "ollama":
+            # No remote quota to respect; just keep the local box from being oversubscribed
+            return RequestScheduler({}, ModelLimits(concurrency=c.ollama_concurrency, rpm=10 ** 6, tpm=10 ** 9))
+        limits = {}
+        for model in set(DEFAULT_MODEL_LIMITS) | set(c.model_limits):
+            config = {"concurrency": c.model_concurrency, **DEFAULT_MODEL_LIMITS.get(model, {}), **c.model_limits.get(model, {})}
+            limits[model] = ModelLimits(**config)
+        return RequestScheduler(limits, ModelLimits(concurrency=c.model_concurrency))
+
+    def _create_groq_client(self):
+        # One client per process: keep-alive connections are shared across sessions and requests
+        c = self.config
+        httpx = lazy_import("httpx")
+        Groq = lazy_import("groq").Groq
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=c.groq_max_connections,
+                max_keepalive_connections=c.groq_max_keepalive,
+                keepalive_expiry=c.groq_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(c.groq_read_timeout, connect=c.groq_connect_timeout),
+        )
+        return Groq(api_key=c.groq_api_key, base_url=c.groq_base_url, http_client=http_client, max_retries=c.groq_max_retries)
+
+    @property
+    def provider(self):
+        with self._lock:
+            if self._provider is None:
+                c = self.config
+                if c.llm_provider == "ollama":
+                    self._provider = OllamaProvider(c.ollama_url, keep_alive=c.ollama_keep_alive, pool_size=c.ollama_concurrency * 2)
+                else:
+                    self._provider = GroqProvider(self._create_groq_client())
+            return self._provider
+
+    @property
+    def ocr_available(self):
+        if self.config.tesseract_cmd and not os.path.exists(self.config.tesseract_cmd):
+            return False
+        # pytesseract/pdf2image/cv2 are imported on first use; only check they exist here
+        return find_spec("pdf2image") is not None and find_spec("pytesseract") is not None
+
+    @property
+    def ocr_pool(self):
+        with self._lock:
+            if self._ocr_pool is None:
+                self._ocr_pool = lazy_import("pdf_ocr").create_ocr_pool(
+                    self.config.ocr_workers, self.config.tesseract_cmd
+                )
+            return self._ocr_pool
+
+    def _stage(self, stage, seconds, on_stage):
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        if on_stage:
+            on_stage(stage, seconds)
+
+    # ---------- LLM ----------
+    def estimate_request_tokens(self, chat_messages) -> int:
+        prompt_tokens = sum(count_tokens(m["content"]) + MESSAGE_TOKEN_OVERHEAD for m in chat_messages)
+        return prompt_tokens + self.config.completion_token_estimate
+
+    def _prepare(self, prompt, model, system, history, on_stage):
+        started = time.perf_counter()
+        chat_messages = build_chat_messages(prompt, system, history, self.config.context_token_budget)
+        self._stage("prompt_assembly", time.perf_counter() - started, on_stage)
+        cache_key = self.response_cache.make_key(f"{self.config.llm_provider}:{model}", self.config.temperature, chat_messages)
+        return chat_messages, cache_key
+
+    def complete(self, prompt: str, model: str = DEFAULT_MODEL, system: str = "", history=None,
+                 session_id="default", on_stage=None) -> str:
+        started = time.perf_counter()
+        chat_messages, cache_key = self._prepare(prompt, model, system, history, on_stage)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            LLM_REQUESTS.inc(model=model, outcome="cache_hit")
+            return cached
+        # Identical requests already in flight (e.g. a class on the same exercise) share one call
+        answer, shared = self.inflight.do(
+            cache_key, lambda: self._complete_uncached(chat_messages, cache_key, model, session_id, on_stage, started)
+        )
+        if shared:
+            LLM_REQUESTS.inc(model=model, outcome="coalesced")
+        return answer
+
+    def _complete_uncached(self, chat_messages, cache_key, model, session_id, on_stage, started):
+        provider = self.provider
+        retries = self.config.request_retries
+        tokens = self.estimate_request_tokens(chat_messages)
+        for attempt in range(retries + 1):
+            try:
+                queued = time.perf_counter()
+                with self.scheduler.slot(session_id, model, tokens) as permit:
+                    self._stage("queue_wait", time.perf_counter() - queued, on_stage)
+                    answer, usage = provider.complete(chat_messages, model, self.config.temperature, self.config.max_tokens)
+                    if usage:
+                        permit["tokens"] = usage
+                break
+            except Exception as e:
+                if attempt < retries and provider.is_retryable(e):
+                    LLM_REQUESTS.inc(model=model, outcome="retry")
+                    time.sleep(backoff_delay(attempt, retry_after=retry_after_seconds(e)))
+                    continue
+                LLM_REQUESTS.inc(model=model, outcome="error")
+                return f"{provider.label} Error: {str(e)}"
+        self._stage("generation", time.perf_counter() - started, on_stage)
+        LLM_REQUESTS.inc(model=model, outcome="ok")
+        LLM_TOKENS.inc(tokens - self.config.completion_token_estimate, model=model, direction="in")
+        LLM_TOKENS.inc(count_tokens(answer or ""), model=model, direction="out")
+        if answer:
+            self.response_cache.put(cache_key, answer)
+        return answer
+
+    def stream(self, prompt: str, model: str = DEFAULT_MODEL, system: str = "", history=None,
+               session_id="default", on_stage=None):
+        started = time.perf_counter()
+        chat_messages, cache_key = self._prepare(prompt, model, system, history, on_stage)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            LLM_REQUESTS.inc(model=model, outcome="cache_hit")
+            yield cached
+            return
+        deltas, shared = self.stream_flights.subscribe(
+            cache_key, lambda: self._stream_uncached(chat_messages, cache_key, model, session_id, on_stage, started)
+        )
+        if shared:
+            LLM_REQUESTS.inc(model=model, outcome="coalesced")
+        first = True
+        for delta in deltas:
+            if first:
+                self._stage("time_to_first_token", time.perf_counter() - started, on_stage)
+                first = False
+            yield delta
+
+    def _stream_uncached(self, chat_messages, cache_key, model, session_id, on_stage, started):
+        provider = self.provider
+        retries = self.config.request_retries
+        tokens = self.estimate_request_tokens(chat_messages)
+        parts = []
+        for attempt in range(retries + 1):
+            try:
+                queued = time.perf_counter()
+                with self.scheduler.slot(session_id, model, tokens) as permit:
+                    self._stage("queue_wait", time.perf_counter() - queued, on_stage)
+                    for delta in provider.stream(chat_messages, model, self.config.temperature, self.config.max_tokens):
+                        parts.append(delta)
+                        yield delta
+                    permit["tokens"] = tokens - self.config.completion_token_estimate + count_tokens("".join(parts))
+                break
+            except Exception as e:
+                # Only retry before the first delta; after that subscribers have already seen output
+                if not parts and attempt < retries and provider.is_retryable(e):
+                    LLM_REQUESTS.inc(model=model, outcome="retry")
+                    time.sleep(backoff_delay(attempt, retry_after=retry_after_seconds(e)))
+                    continue
+                LLM_REQUESTS.inc(model=model, outcome="error")
+                yield f"{provider.label} Error: {str(e)}"
+                return
+        self._stage("generation", time.perf_counter() - started, on_stage)
+        LLM_REQUESTS.inc(model=model, outcome="ok")
+        LLM_TOKENS.inc(tokens - self.config.completion_token_estimate, model=model, direction="in")
+        LLM_TOKENS.inc(count_tokens("".join(parts)), model=model, direction="out")
+        if parts:
+            self.response_cache.put(cache_key, "".join(parts))
+
+    def complete_auto(self, prompt: str, system: str = "", history=None, session_id="default", on_stage=None):
+        """Try the cheapest tier first and escalate on check_answer failures. Returns (answer, model)."""
+        first_started = time.monotonic()
+        for i, tier in enumerate(self.model_tiers):
+            started = time.monotonic()
+            answer = self.complete(prompt, tier, system, history, session_id, on_stage)
+            reason = check_answer(answer)
+            finished = time.monotonic()
+            if reason is None or i == len(self.model_tiers) - 1:
+                self.routing_stats.record_answer(tier, finished - first_started, finished - started)
+                return answer, tier
+            self.routing_stats.record_escalation(reason, finished - started)
+
+    # ---------- OCR ----------
+    def ocr_settings_key(self, kind: str) -> str:
+        c = self.config
+        return f"{kind}|{c.ocr_lang}|{c.ocr_config}|{c.ocr_preprocess}|{c.ocr_code_layout}"
+
+    def load_ocr(self):
+        pytesseract = lazy_import("pytesseract")
+        if self.config.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = self.config.tesseract_cmd
+        return pytesseract
+
+    def ocr_image(self, data: bytes) -> str:
+        c = self.config
+        pytesseract = self.load_ocr()
+        img = lazy_import("PIL.Image").open(io.BytesIO(data))
+        if c.ocr_preprocess:
+            img = lazy_import("ocr_preprocess").preprocess_for_ocr(img)
+        if c.ocr_code_layout:
+            return lazy_import("code_ocr").image_to_code(img, lang=c.ocr_lang, config=c.ocr_config)
+        return pytesseract.image_to_string(img, lang=c.ocr_lang, config=c.ocr_config).strip()
+
+    def ocr_pdf(self, data: bytes, on_page=None) -> str:
+        c = self.config
+        self.load_ocr()
+        pdf_ocr = lazy_import("pdf_ocr")
+        if c.ocr_workers <= 1:
+            return pdf_ocr.ocr_pdf_streaming(
+                data,
+                lang=c.ocr_lang,
+                config=c.ocr_config,
+                dpi=c.ocr_pdf_dpi,
+                grayscale=c.ocr_pdf_grayscale,
+                window=c.ocr_pdf_window,
+                on_page=on_page,
+                layout=c.ocr_code_layout,
+            )
+        return pdf_ocr.ocr_pdf_parallel(
+            data,
+            self.ocr_pool,
+            lang=c.ocr_lang,
+            config=c.ocr_config,
+            dpi=c.ocr_pdf_dpi,
+            grayscale=c.ocr_pdf_grayscale,
+            on_page=on_page,
+            layout=c.ocr_code_layout,
+        )
+
+    def fit_extracted_text(self, text: str) -> str:
+        # Keep the code layout; the compact whitespace-collapsed form is the fallback when layout is off/empty.
+        # Size is handled later by the file context budget (file_prompt), not by cutting here.
+        if self.config.ocr_code_layout and text.strip():
+            return text.strip("\n")
+        return normalize_whitespace(text)
+
+    def extract_file_text(self, filename: str, data: bytes, on_page=None, on_stage=None) -> str:
+        """OCR images and PDFs (cached by content), decode anything else as UTF-8 text."""
+        return self.extract_file(filename, data, on_page, on_stage)[0]
+
+    def extract_file(self, filename: str, data: bytes, on_page=None, on_stage=None):
+        """Like extract_file_text, but returns (text, cached) so callers can tell an OCR cache hit."""
+        lower = filename.lower()
+        started = time.perf_counter()
+        cached = False
+        if lower.endswith(IMAGE_SUFFIXES):
+            text, cached = self.ocr_cache.get_or_compute(data, self.ocr_settings_key("image"), lambda: self.ocr_image(data))
+            self._stage("ocr_image", time.perf_counter() - started, on_stage)
+        elif lower.endswith(".pdf") and self.ocr_available:
+            c = self.config
+            text, cached = self.ocr_cache.get_or_compute(
+                data,
+                self.ocr_settings_key(f"pdf|{c.ocr_pdf_dpi}|{c.ocr_pdf_grayscale}"),
+                lambda: self.ocr_pdf(data, on_page),
+            )
+            self._stage("ocr_pdf", time.perf_counter() - started, on_stage)
+        else:
+            text = data.decode("utf-8", errors="ignore")
+        return self.fit_extracted_text(text), cached
+
+    # ---------- Prompts ----------
+    def budget_prompt(self, prompt, filename, text, question, model, session_id="default", on_stage=None, on_progress=None):
+        """Return `prompt` if it fits FILE_CONTEXT_TOKENS, else a map-reduce prompt over the file's chunks."""
+        c = self.config
+        if count_tokens(prompt) <= c.file_context_tokens or model == MOCK_MODEL:
+            return prompt
+        map_model = self.model_tiers[0] if model == AUTO_MODEL else model
+        started = time.perf_counter()
+        try:
+            return budget_file_prompt(
+                question,
+                filename,
+                text,
+                lambda map_prompt: self.complete(map_prompt, map_model, MAP_SYSTEM, session_id=session_id, on_stage=on_stage),
+                budget=c.file_context_tokens,
+                chunk_tokens=c.file_chunk_tokens,
+                workers=c.file_map_workers,
+                on_progress=on_progress,
+            )
+        finally:
+            self._stage("file_map", time.perf_counter() - started, on_stage)
+
+    def answer(self, prompt, model=DEFAULT_MODEL, system="", history=None, session_id="default", on_stage=None):
+        """Blocking answer for any model choice, including Auto and Mock. Returns (answer, model used)."""
+        if model == MOCK_MODEL:
+            return MOCK_ANSWER, model
+        if model == AUTO_MODEL:
+            return self.complete_auto(prompt, system, history, session_id, on_stage)
+        return self.complete(prompt, model, system, history, session_id, on_stage), model
+
+    def prepare(self, question, mode=None, model=DEFAULT_MODEL, file=None, session_id="default", on_stage=None):
+        """Return (prompt, system) for a question and optional file (name, bytes), with the file budgeted."""
+        file_text = None
+        if file is not None:
+            filename, data = file
+            file_text = (filename, self.extract_file_text(filename, data, on_stage=on_stage))
+        return self.prepare_text(question, mode, model, file_text, session_id, on_stage)
+
+    def prepare_text(self, question, mode=None, model=DEFAULT_MODEL, file_text=None, session_id="default",
+                     on_stage=None, on_progress=None):
+        """Like prepare, for a file whose text is already extracted: file_text is (name, text)."""
+        system = BASE_MODE_PROMPTS.get(mode, "")
+        if file_text is None:
+            return question, system
+        filename, text = file_text
+        prompt = self.budget_prompt(
+            file_prompt(filename, text, question), filename, text, question, model, session_id, on_stage, on_progress
+        )
+        return prompt, system
+
+    def generate(self, question, mode=None, model=DEFAULT_MODEL, history=None, file=None, stream=False,
+                 session_id="default", on_stage=None):
+        """One request end to end. Returns the answer, or a generator of deltas when stream=True (plain models only)."""
+        prompt, system = self.prepare(question, mode, model, file, session_id, on_stage)
+        if stream and model not in (AUTO_MODEL, MOCK_MODEL):
+            return self.stream(prompt, model, system, history, session_id, on_stage)
+        return self.answer(prompt, model, system, history, session_id, on_stage)[0]
@@ -0,0 +1,141 @@
+"""Context budgeting for large attached files: chunk at definition boundaries, map in parallel, reduce.
+
+    prompt = budget_file_prompt(question, filename, text, complete, budget=3000)
+
+`complete(prompt) -> str` is any blocking LLM call; map requests run on a thread pool so a large
+file costs roughly one map round plus one reduce, regardless of how many chunks it has.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_context import count_tokens
+from routing import check_answer
+
+# Top-level definitions in Python and the usual C-like / JS / Go / Rust suspects
+BOUNDARY = re.compile(
+    r"^(?:@|def |async def |class |function |export |public |private |protected |static |"
+    r"interface |struct |enum |impl |fn |func |module |package )"
+)
+MAX_REDUCE_ROUNDS = 3
+
+
+class FileContextError(RuntimeError):
+    """A map request failed, or the file could not be brought under budget; str() is the reason."""
+
+MAP_SYSTEM = (
+    "You are reading one part of a larger file. Extract only what is relevant to the user's request: "
+    "definitions, bugs, errors, and the lines they are on. Be terse; another step will combine the parts."
+)
+
+
+def _segments(text):
+    """Split into top-level blocks; decorators and comments stay with the definition that follows."""
+    segments, current = [], []
+    for line in text.splitlines():
+        if BOUNDARY.match(line) and current and not all(
+            l.startswith(("@", "#", "//")) or not l.strip() for l in current
+        ):
+            segments.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        segments.append("\n".join(current))
+    return segments
+
+
+def _split_oversized(segment, max_tokens):
+    # Blank lines first, then single lines, then raw words (for whitespace-collapsed OCR text)
+    for separator in ("\n\n", "\n", " "):
+        if separator in segment:
+            pieces = segment.split(separator)
+            break
+    else:
+        step = max_tokens * 4
+        return [segment[i:i + step] for i in range(0, len(segment), step)]
+    return _pack(pieces, max_tokens, separator)
+
+
+def _pack(pieces, max_tokens, separator):
+    chunks, current, used = [], [], 0
+    for piece in pieces:
+        cost = count_tokens(piece) + 1
+        if cost > max_tokens:
+            if current:
+                chunks.append(separator.join(current))
+                current, used = [], 0
+            chunks.extend(_split_oversized(piece, max_tokens))
+            continue
+        if current and used + cost > max_tokens:
+            chunks.append(separator.join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += cost
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def split_code_chunks(text: str, max_tokens: int):
+    """Chunks of at most ~max_tokens, cut at function/class boundaries where possible."""
+    return _pack(_segments(text), max_tokens, "\n")
+
+
+def map_prompt(question, filename, chunk, index, total):
+    return (
+        f"**File:** {filename} (part {index} of {total})\n"
+        f"```\n{chunk}\n```\n\n"
+        f"**User request:** {question}\n\n"
+        f"Write notes on this part for the request above."
+    )
+
+
+def reduce_prompt(question, filename, notes):
+    joined = "\n\n".join(f"**Part {i}:**\n{note}" for i, note in enumerate(notes, 1))
+    return (
+        f"**File:** {filename} was too large to send whole. It was split into {len(notes)} parts "
+        f"and each part was analyzed separately:\n\n{joined}\n\n"
+        f"**User request:** {question}\n\n"
+        f"Combine the notes into one complete answer."
+    )
+
+
+def _truncated_reduce_prompt(question, filename, notes, budget):
+    # Last resort after MAX_REDUCE_ROUNDS: cut every note to the same length so the prompt fits
+    overhead = count_tokens(reduce_prompt(question, filename, [""] * len(notes)))
+    per_note = (budget - overhead) * 4 // len(notes) - 4  # count_tokens is ~4 characters per token
+    if per_note <= 0:
+        raise FileContextError(f"{filename} is too large to summarize within {budget} tokens")
+    notes = [note if len(note) <= per_note else note[:per_note - 1] + "…" for note in notes]
+    return reduce_prompt(question, filename, notes)
+
+
+def budget_file_prompt(question, filename, text, complete, budget=3000, chunk_tokens=2000, workers=4, on_progress=None):
+    """Return a prompt that fits `budget` tokens: the whole file if it fits, else a reduce prompt over map notes.
+
+    Raises FileContextError when a map request returns a provider error instead of notes.
+    """
+    full = (
+        f"**Screenshot/File:** {filename}\n"
+        f"```\n{text}\n```\n\n"
+        f"**User Question:** {question}"
+    )
+    if count_tokens(full) <= budget:
+        return full
+    source = text
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(MAX_REDUCE_ROUNDS):
+            chunks = split_code_chunks(source, chunk_tokens)
+            prompts = [map_prompt(question, filename, chunk, i, len(chunks)) for i, chunk in enumerate(chunks, 1)]
+            notes = []
+            for note in pool.map(complete, prompts):
+                if check_answer(note) == "error":
+                    raise FileContextError(note)
+                notes.append(note)
+                if on_progress:
+                    on_progress(len(notes), len(prompts))
+            prompt = reduce_prompt(question, filename, notes)
+            if count_tokens(prompt) <= budget:
+                return prompt
+            # Notes still too long: map over the notes themselves
+            source = "\n\n".join(notes)
+    return _truncated_reduce_prompt(question, filename, notes, budget)
@@ -0,0 +1,80 @@
+"""Deferred imports for the heavy dependencies, with per-module import timing.
+
+    python lazy_imports.py          # cold import cost of each heavy module, as JSON
+
+app.py loads OCR, speech and LLM SDK modules through lazy_import() only when a feature is
+first used, so a fresh worker reaches the onboarding screen without paying for them.
+"""
+import importlib
+import json
+import subprocess
+import sys
+import threading
+import time
+
+from metrics import COLD_START_SECONDS, IMPORT_SECONDS
+
+# Roughly in the order a user session first needs them
+HEAVY_MODULES = [
+    "groq",
+    "httpx",
+    "requests",
+    "PIL.Image",
+    "pytesseract",
+    "numpy",
+    "cv2",
+    "pdf2image",
+    "speech_recognition",
+    "vosk",
+]
+
+# Imported once per process, on the first script run, so this approximates worker start
+PROCESS_STARTED = time.perf_counter()
+
+_lock = threading.Lock()
+_import_times = {}
+_cold_start_seconds = None
+
+
+def lazy_import(name):
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        elapsed = time.perf_counter() - started
+    _import_times[name] = elapsed
+    IMPORT_SECONDS.set(elapsed, module=name)
+    return module
+
+
+def mark_first_render():
+    global _cold_start_seconds
+    if _cold_start_seconds is None:
+        _cold_start_seconds = time.perf_counter() - PROCESS_STARTED
+        COLD_START_SECONDS.set(_cold_start_seconds)
+
+
+def import_report():
+    return {"cold_start_seconds": _cold_start_seconds, "imports": dict(_import_times)}
+
+
+def measure_cold_imports(modules=HEAVY_MODULES):
+    """Import each module in a fresh interpreter and return {module: seconds or error}."""
+    report = {}
+    for name in modules:
+        code = (
+            "import time, importlib; t = time.perf_counter(); "
+            f"importlib.import_module({name!r}); print(time.perf_counter() - t)"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if result.returncode == 0:
+            report[name] = round(float(result.stdout.strip()), 4)
+        else:
+            report[name] = f"unavailable: {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'error'}"
+    return report
+
+
+if __name__ == "__main__":
+    print(json.dumps(measure_cold_imports(), indent=2))
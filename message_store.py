@@ -0,0 +1,100 @@
+"""Compact in-memory chat messages with a per-session byte budget.
+
+Messages are __slots__ records instead of dicts: roles are interned, timestamps are epoch floats
+formatted on demand, and bodies outside the rendered window are kept zlib-compressed. Every
+message is already persisted in the thread store, so trimming the oldest ones out of memory is a
+spill to disk; "Load earlier messages" pages them back in.
+"""
+import sys
+import zlib
+from datetime import datetime
+
+from chat_context import MESSAGE_TOKEN_OVERHEAD, count_tokens
+
+COMPRESS_MIN_BYTES = 512  # shorter bodies don't shrink enough to pay for the zlib header
+RECORD_OVERHEAD = 120  # object header + slots, roughly, on 64-bit CPython
+
+
+class Message:
+    """A chat message that still reads like the old dicts: msg["role"], msg.get("timestamp")."""
+
+    __slots__ = ("id", "role", "created", "tokens", "_body")
+
+    def __init__(self, id, role, content, created=None):
+        self.id = id
+        self.role = sys.intern(role)
+        # Epoch seconds; rows written before the created column existed keep their "HH:MM" text
+        self.created = sys.intern(created) if isinstance(created, str) else created
+        self.tokens = count_tokens(content) + MESSAGE_TOKEN_OVERHEAD
+        self._body = content
+
+    @classmethod
+    def from_row(cls, row):
+        created = row["created"] if row["created"] is not None else row["timestamp"]
+        return cls(row["id"], row["role"], row["content"], created)
+
+    @property
+    def content(self):
+        body = self._body
+        return zlib.decompress(body).decode("utf-8") if isinstance(body, bytes) else body
+
+    @property
+    def timestamp(self):
+        if self.created is None or isinstance(self.created, str):
+            return self.created or "now"
+        return datetime.fromtimestamp(self.created).strftime("%H:%M")
+
+    @property
+    def compressed(self):
+        return isinstance(self._body, bytes)
+
+    def freeze(self):
+        """Compress the body if that saves space. Returns the bytes saved."""
+        body = self._body
+        if isinstance(body, bytes) or len(body) < COMPRESS_MIN_BYTES:
+            return 0
+        packed = zlib.compress(body.encode("utf-8"), 6)
+        saved = sys.getsizeof(body) - sys.getsizeof(packed)
+        if saved > 0:
+            self._body = packed
+            return saved
+        return 0
+
+    def nbytes(self):
+        return RECORD_OVERHEAD + sys.getsizeof(self._body)
+
+    def __getitem__(self, key):
+        if key in ("id", "role", "content", "timestamp", "tokens"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"Message(id={self.id!r}, role={self.role!r}, {self.nbytes()} bytes)"
+
+
+def messages_nbytes(messages):
+    return sum(message.nbytes() for message in messages)
+
+
+def compact_messages(messages, hot, cap):
+    """Compress all but the newest `hot` messages, then drop the oldest while over `cap` bytes.
+
+    The newest `hot` messages are never dropped, so the cap is soft when the rendered window
+    alone exceeds it. Returns how many messages were dropped from the front of the list.
+    """
+    for message in messages[:-hot] if hot else messages:
+        message.freeze()
+    total = messages_nbytes(messages)
+    dropped = 0
+    while total > cap and len(messages) - dropped > hot:
+        total -= messages[dropped].nbytes()
+        dropped += 1
+    if dropped:
+        del messages[:dropped]
+    return dropped
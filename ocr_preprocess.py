@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+from PIL import Image
+
+# Tesseract is tuned for ~300 DPI text; a 4K screenshot is far more pixels than it needs, but only
+# as long as the glyphs stay big enough to read, so downscaling never takes text below MIN_TEXT_HEIGHT
+TARGET_DPI = 300
+SCREEN_DPI = 96
+MAX_SIDE = 2000
+MIN_TEXT_HEIGHT = 20
+MIN_GLYPHS = 20  # fewer components than this and the height estimate is noise
+CROP_MARGIN = 12
+MAX_DESKEW_ANGLE = 15.0
+
+
+def to_grayscale(img: Image.Image) -> np.ndarray:
+    arr = np.asarray(img.convert("RGB"))
+    gray = cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY)
+    # Dark-theme IDE screenshots: flip so text is dark on light, which is what Tesseract expects
+    if gray.mean() < 127:
+        gray = cv2.bitwise_not(gray)
+    return gray
+
+
+def text_height(gray: np.ndarray):
+    """Median glyph height in pixels, or None if there is too little text to tell."""
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    stats = cv2.connectedComponentsWithStats(ink, connectivity=8)[2]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    # Drop specks and box-drawing / panel borders
+    heights = heights[(heights >= 4) & (heights <= gray.shape[0] // 4)]
+    if len(heights) < MIN_GLYPHS:
+        return None
+    return float(np.median(heights))
+
+
+def downscale(gray: np.ndarray, source_dpi=None, target_dpi=TARGET_DPI, max_side=MAX_SIDE,
+              min_text_height=MIN_TEXT_HEIGHT) -> np.ndarray:
+    scale = 1.0
+    if source_dpi and source_dpi > target_dpi:
+        scale = target_dpi / source_dpi
+    longest = max(gray.shape[:2]) * scale
+    if longest > max_side:
+        scale *= max_side / longest
+    if scale >= 1.0:
+        return gray
+    # HiDPI code screenshots: small monospace text must not shrink below what Tesseract reads well
+    height = text_height(gray)
+    if height is None:
+        return gray
+    scale = max(scale, min_text_height / height)
+    if scale >= 1.0:
+        return gray
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def crop_to_text(gray: np.ndarray, margin=CROP_MARGIN) -> np.ndarray:
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    coords = cv2.findNonZero(ink)
+    if coords is None:
+        return gray
+    x, y, w, h = cv2.boundingRect(coords)
+    height, width = gray.shape[:2]
+    x0, y0 = max(x - margin, 0), max(y - margin, 0)
+    x1, y1 = min(x + w + margin, width), min(y + h + margin, height)
+    return gray[y0:y1, x0:x1]
+
+
+def deskew(gray: np.ndarray, max_angle=MAX_DESKEW_ANGLE) -> np.ndarray:
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    coords = cv2.findNonZero(ink)
+    if coords is None or len(coords) < 50:
+        return gray
+    # minAreaRect's angle range differs between OpenCV versions; fold it into [-45, 45)
+    angle = cv2.minAreaRect(coords)[-1] % 90
+    if angle >= 45:
+        angle -= 90
+    if abs(angle) < 0.5 or abs(angle) > max_angle:
+        return gray
+    height, width = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+
+
+def preprocess_for_ocr(img: Image.Image) -> np.ndarray:
+    dpi = img.info.get("dpi", (SCREEN_DPI, SCREEN_DPI))[0] or SCREEN_DPI
+    gray = to_grayscale(img)
+    gray = downscale(gray, source_dpi=dpi)
+    gray = crop_to_text(gray)
+    gray = deskew(gray)
+    return binarize(gray)
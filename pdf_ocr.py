@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from code_ocr import image_to_code
+
+
+def _init_worker(tesseract_cmd):
+    # Spawned workers start with a fresh pytesseract that only looks for `tesseract` on PATH
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def create_ocr_pool(workers=None, tesseract_cmd=None) -> ProcessPoolExecutor:
+    # spawn, not fork: the Streamlit server is multi-threaded and forking it is unsafe
+    return ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(tesseract_cmd,),
+    )
+
+
+def iter_pdf_pages(pdf_path, page_count, dpi=200, grayscale=True, window=1):
+    # Rasterize `window` pages at a time; callers OCR and drop each page before the next batch loads
+    for first in range(1, page_count + 1, window):
+        last = min(first + window - 1, page_count)
+        images = convert_from_path(pdf_path, dpi=dpi, grayscale=grayscale, first_page=first, last_page=last)
+        for offset, image in enumerate(images):
+            yield first + offset, image
+        del images
+
+
+def _image_to_text(image, lang, config, layout):
+    if layout:
+        return image_to_code(image, lang=lang, config=config)
+    return pytesseract.image_to_string(image, lang=lang, config=config)
+
+
+def _ocr_page(pdf_path, page_number, dpi, grayscale, lang, config, layout=False):
+    # Each worker rasterizes only its own page, so the parent never holds page images
+    images = convert_from_path(pdf_path, dpi=dpi, grayscale=grayscale, first_page=page_number, last_page=page_number)
+    if not images:
+        return page_number, ""
+    try:
+        return page_number, _image_to_text(images[0], lang, config, layout)
+    finally:
+        images[0].close()
+
+
+def _spool_pdf(data: bytes) -> str:
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+        return f.name
+
+
+def ocr_pdf_streaming(data: bytes, lang="eng", config="", dpi=200, grayscale=True, window=1, on_page=None, layout=False) -> str:
+    pdf_path = _spool_pdf(data)
+    try:
+        page_count = int(pdfinfo_from_path(pdf_path)["Pages"])
+        pages = []
+        for page_number, image in iter_pdf_pages(pdf_path, page_count, dpi, grayscale, window):
+            try:
+                pages.append(_image_to_text(image, lang, config, layout))
+            finally:
+                image.close()
+            if on_page:
+                on_page(page_number, page_count)
+        return "\n".join(pages)
+    finally:
+        os.remove(pdf_path)
+
+
+def ocr_pdf_parallel(data: bytes, pool: ProcessPoolExecutor, lang="eng", config="", dpi=200, grayscale=True, on_page=None, layout=False) -> str:
+    pdf_path = _spool_pdf(data)
+    futures = []
+    try:
+        page_count = int(pdfinfo_from_path(pdf_path)["Pages"])
+        pages = [""] * page_count
+        futures = [
+            pool.submit(_ocr_page, pdf_path, n, dpi, grayscale, lang, config, layout)
+            for n in range(1, page_count + 1)
+        ]
+        done = 0
+        for future in as_completed(futures):
+            page_number, text = future.result()
+            pages[page_number - 1] = text
+            done += 1
+            if on_page:
+                on_page(done, page_count)
+        return "\n".join(pages)
+    finally:
+        for future in futures:
+            future.cancel()
+        os.remove(pdf_path)
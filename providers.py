@@ -0,0 +1,127 @@
+import json
+from abc import ABC, abstractmethod
+
+from lazy_imports import lazy_import
+
+
+class LLMProvider(ABC):
+    """Chat-completion backend used by call_groq_api / stream_groq_api."""
+
+    label = "LLM"
+
+    @abstractmethod
+    def complete(self, messages, model, temperature, max_tokens):
+        """Return (text, total_tokens or None)."""
+
+    @abstractmethod
+    def stream(self, messages, model, temperature, max_tokens):
+        """Yield content deltas as they arrive."""
+
+    def is_retryable(self, error) -> bool:
+        return False
+
+
+class GroqProvider(LLMProvider):
+    label = "Groq"
+
+    def __init__(self, client):
+        self.client = client
+
+    def complete(self, messages, model, temperature, max_tokens):
+        chat_completion = self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=False
+        )
+        usage = chat_completion.usage.total_tokens if chat_completion.usage else None
+        return chat_completion.choices[0].message.content, usage
+
+    def stream(self, messages, model, temperature, max_tokens):
+        stream = self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    def is_retryable(self, error) -> bool:
+        groq = lazy_import("groq")
+        if isinstance(error, (groq.RateLimitError, groq.APIConnectionError)):
+            return True
+        return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+
+class OllamaProvider(LLMProvider):
+    """Local Ollama server over its native /api/chat endpoint."""
+
+    label = "Ollama"
+
+    def __init__(self, base_url="http://localhost:11434", keep_alive="30m", connect_timeout=5.0, read_timeout=300.0, pool_size=16):
+        self.base_url = base_url.rstrip("/")
+        # keep_alive stops Ollama unloading the model between prompts
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        requests = lazy_import("requests")
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _payload(self, messages, model, temperature, max_tokens, stream):
+        return {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": temperature, "num_predict": max_tokens},
+        }
+
+    def complete(self, messages, model, temperature, max_tokens):
+        response = self.session.post(
+            f"{self.base_url}/api/chat",
+            json=self._payload(messages, model, temperature, max_tokens, stream=False),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+        usage = data.get("prompt_eval_count", 0) + data.get("eval_count", 0)
+        return data["message"]["content"], usage or None
+
+    def stream(self, messages, model, temperature, max_tokens):
+        with self.session.post(
+            f"{self.base_url}/api/chat",
+            json=self._payload(messages, model, temperature, max_tokens, stream=True),
+            timeout=self.timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            # NDJSON: one JSON object per line, the last one has "done": true
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                delta = chunk.get("message", {}).get("content")
+                if delta:
+                    yield delta
+                if chunk.get("done"):
+                    break
+
+    def is_retryable(self, error) -> bool:
+        requests = lazy_import("requests")
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, "response", None)
+        return isinstance(error, requests.HTTPError) and response is not None and (
+            response.status_code == 429 or response.status_code >= 500
+        )
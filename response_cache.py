@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from ocr_cache import trim_directory
+
+
+class ResponseCache:
+    """LLM answers keyed by (model, temperature, chat messages), with TTL + LRU eviction.
+
+    With `near_duplicates` on, message contents are whitespace-normalized before hashing so
+    the same snippet pasted with different indentation or trailing blank lines still hits.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, disk_dir=None, disk_max_bytes=64 * 1024 * 1024, near_duplicates=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.near_duplicates = near_duplicates
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def make_key(self, model, temperature, messages) -> str:
+        if self.near_duplicates:
+            messages = [
+                {"role": m["role"], "content": " ".join(m["content"].split())}
+                for m in messages
+            ]
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "messages": messages},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, text = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return text
+                del self._memory[key]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None:
+                if self._expired(entry["created"]):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                else:
+                    os.utime(path)
+                    with self._lock:
+                        self.disk_hits += 1
+                        self._remember(key, entry["created"], entry["text"])
+                    return entry["text"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, text):
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, text)
+        if self.disk_dir:
+            try:
+                tmp_path = self._disk_path(key) + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"created": created, "text": text}, f, ensure_ascii=False)
+                os.replace(tmp_path, self._disk_path(key))
+                trim_directory(self.disk_dir, self.disk_max_bytes, ".json")
+            except OSError:
+                pass
+
+    def _remember(self, key, created, text):
+        self._memory[key] = (created, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._memory),
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
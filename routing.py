@@ -0,0 +1,66 @@
+import ast
+import re
+import threading
+
+# Cheapest first; "Auto" mode only moves to the next tier when the answer fails check_answer
+AUTO_MODEL_TIERS = ["llama-3.1-8b-instant", "llama-3.3-70b-versatile"]
+
+_PYTHON_BLOCK = re.compile(r"```(?:python|py)[^\n]*\n(.*?)```", re.DOTALL)
+
+
+def check_answer(answer: str):
+    """Return why an answer needs escalating, or None if it looks usable."""
+    if not answer or not answer.strip():
+        return "empty"
+    if answer.startswith(("Groq Error:", "Ollama Error:")):
+        return "error"
+    if answer.count("```") % 2:
+        return "truncated"
+    for block in _PYTHON_BLOCK.findall(answer):
+        try:
+            ast.parse(block)
+        except SyntaxError:
+            return "unparseable code"
+    return None
+
+
+class RoutingStats:
+    """Which tier answered Auto-mode requests, and how long each took."""
+
+    def __init__(self, tiers=AUTO_MODEL_TIERS):
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self.answered = {}
+        self.latency = {}  # from the first attempt, so escalated requests include the failed tiers
+        self.call_latency = {}  # the answering call alone
+        self.escalations = {}
+        self.escalated_seconds = 0.0
+
+    def record_answer(self, model, seconds, call_seconds=None):
+        with self._lock:
+            self.answered[model] = self.answered.get(model, 0) + 1
+            self.latency[model] = self.latency.get(model, 0.0) + seconds
+            self.call_latency[model] = self.call_latency.get(model, 0.0) + (seconds if call_seconds is None else call_seconds)
+
+    def record_escalation(self, reason, seconds=0.0):
+        with self._lock:
+            self.escalations[reason] = self.escalations.get(reason, 0) + 1
+            self.escalated_seconds += seconds
+
+    def summary(self):
+        with self._lock:
+            average = {model: self.latency[model] / count for model, count in self.answered.items()}
+            call_average = {model: self.call_latency[model] / count for model, count in self.answered.items()}
+            small, large = self.tiers[0], self.tiers[-1]
+            saved = None
+            if small in call_average and large in call_average:
+                # Time the small-tier answers would have cost had they gone straight to the large model,
+                # less the time spent on small-tier attempts that were escalated anyway
+                saved = (call_average[large] - call_average[small]) * self.answered[small] - self.escalated_seconds
+            return {
+                "answered": dict(self.answered),
+                "average_latency": average,
+                "escalations": dict(self.escalations),
+                "escalated_seconds": self.escalated_seconds,
+                "seconds_saved": saved,
+            }
@@ -0,0 +1,148 @@
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+@dataclass
+class ModelLimits:
+    concurrency: int = 8
+    rpm: int = 30
+    tpm: int = 6000
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        # A request larger than the whole bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        # May go negative when a request turns out bigger than estimated; later requests pay it back
+        self.level -= amount
+
+
+class _ModelQueue:
+    def __init__(self, limits: ModelLimits):
+        self.limits = limits
+        self.active = 0
+        self.requests = TokenBucket(limits.rpm)
+        self.tokens = TokenBucket(limits.tpm)
+        # session id -> waiting (future, tokens); served round-robin so one session can't starve the rest
+        self.sessions = OrderedDict()
+        self.wakeup = None
+
+
+class RequestScheduler:
+    """Admission control for LLM calls, run on a private asyncio loop.
+
+    Callers block in `slot()` until their model has a free concurrency slot and enough
+    request/token budget, then make the call on their own thread.
+    """
+
+    def __init__(self, limits=None, default_limits=None):
+        self.limits = limits or {}
+        self.default_limits = default_limits or ModelLimits()
+        self._queues = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-scheduler", daemon=True)
+        self._thread.start()
+
+    def _queue(self, model):
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = self._queues[model] = _ModelQueue(self.limits.get(model, self.default_limits))
+        return queue
+
+    # ---- loop-side ----
+    def _enqueue(self, session_id, model, tokens, future):
+        self._queue(model).sessions.setdefault(session_id, deque()).append((future, tokens))
+        self._dispatch(model)
+
+    def _release(self, model, extra_tokens):
+        queue = self._queue(model)
+        queue.active -= 1
+        if extra_tokens:
+            queue.tokens.take(extra_tokens)
+        self._dispatch(model)
+
+    def _wake(self, model):
+        self._queue(model).wakeup = None
+        self._dispatch(model)
+
+    def _dispatch(self, model):
+        queue = self._queue(model)
+        while queue.sessions and queue.active < queue.limits.concurrency:
+            session_id, waiters = next(iter(queue.sessions.items()))
+            future, tokens = waiters[0]
+            if future.cancelled():
+                self._pop_waiter(queue, session_id, waiters)
+                continue
+            now = time.monotonic()
+            delay = max(queue.requests.wait_time(1, now), queue.tokens.wait_time(tokens, now))
+            if delay > 0:
+                if queue.wakeup is None:
+                    queue.wakeup = self._loop.call_later(delay, self._wake, model)
+                return
+            self._pop_waiter(queue, session_id, waiters)
+            if not future.set_running_or_notify_cancel():
+                continue
+            queue.requests.take(1)
+            queue.tokens.take(tokens)
+            queue.active += 1
+            future.set_result(None)
+
+    @staticmethod
+    def _pop_waiter(queue, session_id, waiters):
+        waiters.popleft()
+        if waiters:
+            queue.sessions.move_to_end(session_id)
+        else:
+            del queue.sessions[session_id]
+
+    # ---- caller-side ----
+    @contextmanager
+    def slot(self, session_id, model, tokens):
+        """Hold a slot for one request. Set `permit["tokens"]` to the real usage if known."""
+        future = Future()
+        self._loop.call_soon_threadsafe(self._enqueue, session_id, model, tokens, future)
+        future.result()
+        permit = {"tokens": tokens}
+        try:
+            yield permit
+        finally:
+            self._loop.call_soon_threadsafe(self._release, model, permit["tokens"] - tokens)
+
+    def stats(self):
+        return {
+            model: {
+                "active": queue.active,
+                "waiting": sum(len(waiters) for waiters in queue.sessions.values()),
+            }
+            for model, queue in list(self._queues.items())
+        }
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,234 @@
+"""Async HTTP API on the same engine as the Streamlit UI (stdlib asyncio, no extra dependencies).
+
+    python cli.py serve --port 8600
+
+    POST /v1/generate  {"prompt", "mode"?, "model"?, "history"?, "stream"?, "session_id"?,
+                        "file"?: {"name", "content_base64"}}
+                       -> {"answer", "model"}, or with "stream": true a text/event-stream of
+                          data: {"delta": ...} events ending in data: [DONE]; a provider failure
+                          arrives as data: {"error": ...}
+                       400 for malformed input, 502 when a large file's map step fails, 500 on unexpected errors
+    POST /v1/ocr       {"name", "content_base64"} -> {"text"}
+    GET  /healthz
+    GET  /metrics      Prometheus text, same registry as the UI's endpoint
+
+Engine calls are blocking, so each runs on a worker thread; at most `concurrency` run at once and
+the engine's request scheduler still applies per-model limits and fairness across session_ids.
+"""
+import asyncio
+import base64
+import binascii
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from engine import AUTO_MODEL, DEFAULT_MODEL, MOCK_MODEL
+from file_context import FileContextError
+from metrics import REGISTRY
+from routing import check_answer
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    """Return (method, path, headers, body), or None when the client closed the connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "body too large")
+    body = await reader.readexactly(length) if length else b""
+    headers["_version"] = version
+    return method, target.split("?")[0], headers, body
+
+
+def response_head(status, content_type, length=None, keep_alive=True):
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Type: {content_type}"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def validate_history(history):
+    if not isinstance(history, list) or not all(
+        isinstance(m, dict) and isinstance(m.get("role"), str) and isinstance(m.get("content"), str)
+        for m in history
+    ):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, '"history" must be a list of {"role", "content"} strings')
+    return history
+
+
+def decode_file(payload):
+    try:
+        return payload["name"], base64.b64decode(payload["content_base64"], validate=True)
+    except (KeyError, TypeError, binascii.Error):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, 'file needs "name" and base64 "content_base64"')
+
+
+class APIServer:
+    def __init__(self, engine, concurrency=16):
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="api")
+        self.slots = asyncio.Semaphore(concurrency)
+
+    async def call(self, fn, *args):
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close" and headers["_version"] == "HTTP/1.1"
+                    streamed = await self.route(method, path, body, writer, keep_alive, peer)
+                except HTTPError as e:
+                    await self.send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                except FileContextError as e:
+                    await self.send_json(writer, HTTPStatus.BAD_GATEWAY, {"error": str(e)}, keep_alive=False)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # e.g. OCR libraries missing; a JSON error beats an empty reply
+                    await self.send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR,
+                                         {"error": f"{type(e).__name__}: {e}"}, keep_alive=False)
+                    break
+                if streamed or not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def send_json(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(response_head(status, "application/json", len(body), keep_alive) + body)
+        await writer.drain()
+
+    async def route(self, method, path, body, writer, keep_alive, peer):
+        """Handle one request; return True if the response was streamed (connection must close)."""
+        if path == "/healthz" and method == "GET":
+            await self.send_json(writer, HTTPStatus.OK, {"status": "ok"}, keep_alive)
+        elif path == "/metrics" and method == "GET":
+            text = REGISTRY.render().encode("utf-8")
+            writer.write(response_head(HTTPStatus.OK, "text/plain; version=0.0.4; charset=utf-8", len(text), keep_alive) + text)
+            await writer.drain()
+        elif path in ("/v1/generate", "/v1/ocr"):
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST")
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be JSON")
+            if not isinstance(payload, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+            if path == "/v1/ocr":
+                name, data = decode_file(payload)
+                text = await self.call(self.engine.extract_file_text, name, data)
+                await self.send_json(writer, HTTPStatus.OK, {"text": text}, keep_alive)
+            else:
+                return await self.generate(payload, writer, keep_alive, peer)
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for {path}")
+        return False
+
+    async def generate(self, payload, writer, keep_alive, peer):
+        prompt = payload.get("prompt")
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, '"prompt" is required')
+        model = payload.get("model") or DEFAULT_MODEL
+        mode = payload.get("mode")
+        history = validate_history(payload.get("history") or [])
+        # Fair queuing in the scheduler is per session; default to one session per client address
+        session_id = str(payload.get("session_id") or (peer[0] if peer else "api"))
+        file = decode_file(payload["file"]) if payload.get("file") else None
+
+        prompt, system = await self.call(self.engine.prepare, prompt, mode, model, file, session_id)
+        if payload.get("stream") and model not in (AUTO_MODEL, MOCK_MODEL):
+            await self.stream(writer, self.engine.stream(prompt, model, system, history, session_id))
+            return True
+        answer, used = await self.call(self.engine.answer, prompt, model, system, history, session_id)
+        await self.send_json(writer, HTTPStatus.OK, {"answer": answer, "model": used}, keep_alive)
+        return False
+
+    async def stream(self, writer, deltas):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        disconnected = threading.Event()
+
+        def pump():
+            try:
+                for delta in deltas:
+                    if disconnected.is_set():
+                        break
+                    # The engine reports provider failures in-band as "<Provider> Error: ..."
+                    event = {"error": delta} if check_answer(delta) == "error" else {"delta": delta}
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, {"error": str(e)})
+            finally:
+                deltas.close()
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        writer.write(response_head(HTTPStatus.OK, "text/event-stream", keep_alive=False))
+        async with self.slots:
+            worker = loop.run_in_executor(self.executor, pump)
+            try:
+                while True:
+                    event = await queue.get()
+                    if event is None:
+                        break
+                    writer.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    await writer.drain()
+                writer.write(b"data: [DONE]\n\n")
+                await writer.drain()
+            except ConnectionError:
+                disconnected.set()
+            finally:
+                await worker
+
+
+async def serve(engine, host="127.0.0.1", port=8600, concurrency=16):
+    api = APIServer(engine, concurrency)
+    server = await asyncio.start_server(api.handle, host, port)
+    print(f"serving on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def run(engine, host="127.0.0.1", port=8600, concurrency=16):
+    try:
+        asyncio.run(serve(engine, host, port, concurrency))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,107 @@
+"""Single-flight coalescing: identical in-flight requests share one upstream call.
+
+SingleFlight covers blocking calls; StreamFlight runs one upstream generator on a thread and lets
+any number of subscribers replay its deltas from the start while it is still producing them.
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Return (result, shared). Only the first caller for `key` runs fn; the rest wait for it."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class _Flight:
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+
+class StreamFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0
+
+    def subscribe(self, key, start):
+        """Return (deltas, shared). start() makes the upstream generator; it runs once per key at a time.
+
+        The upstream is drained on its own thread, so a subscriber that stops reading (closed tab,
+        dropped connection) does not stall the others.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if leader:
+            threading.Thread(target=self._pump, args=(key, flight, start), name="stream-flight", daemon=True).start()
+        return self._replay(flight), not leader
+
+    def _pump(self, key, flight, start):
+        try:
+            for delta in start():
+                with flight.cond:
+                    flight.parts.append(delta)
+                    flight.cond.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    @staticmethod
+    def _replay(flight):
+        sent = 0
+        while True:
+            with flight.cond:
+                while sent >= len(flight.parts) and not flight.done:
+                    flight.cond.wait()
+                new = flight.parts[sent:]
+                sent = len(flight.parts)
+                finished = flight.done
+            yield from new
+            if finished:
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,240 @@
+"""Background speech capture with energy-based VAD and pluggable local transcription engines.
+
+A SpeechListener records one utterance on a worker thread: it reads the microphone in short
+chunks, ends the utterance after a run of silence, and transcribes with a local engine (Vosk or
+whisper.cpp). The Streamlit script only polls listener.state / listener.result, so it never blocks.
+"""
+import array
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+
+from lazy_imports import lazy_import
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit mono PCM
+
+
+def rms(chunk: bytes) -> float:
+    samples = array.array("h")
+    samples.frombytes(chunk[: len(chunk) - len(chunk) % SAMPLE_WIDTH])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class EnergyVAD:
+    """Marks chunks as speech when they rise clearly above a noise floor learned from the first chunks."""
+
+    def __init__(self, calibration_chunks=10, ratio=3.0, min_threshold=300.0):
+        self.calibration_chunks = calibration_chunks
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+        self._noise = []
+
+    def is_speech(self, chunk: bytes) -> bool:
+        level = rms(chunk)
+        if len(self._noise) < self.calibration_chunks:
+            self._noise.append(level)
+            return False
+        floor = sum(self._noise) / len(self._noise)
+        return level > max(self.min_threshold, floor * self.ratio)
+
+
+# ---------- Engines ----------
+class SpeechEngine(ABC):
+    """Local speech-to-text. open() returns a per-utterance session fed with PCM chunks."""
+
+    name = "speech"
+
+    def open(self, sample_rate):
+        return BufferedSession(self, sample_rate)
+
+    @abstractmethod
+    def transcribe(self, pcm: bytes, sample_rate) -> str:
+        """Text for one finished utterance of 16-bit mono PCM."""
+
+
+class BufferedSession:
+    def __init__(self, engine, sample_rate):
+        self.engine = engine
+        self.sample_rate = sample_rate
+        self.chunks = []
+
+    def accept(self, chunk: bytes):
+        self.chunks.append(chunk)
+
+    def result(self) -> str:
+        return self.engine.transcribe(b"".join(self.chunks), self.sample_rate)
+
+
+class VoskEngine(SpeechEngine):
+    """Streams audio into Vosk while the user is still talking, so the text is ready at end of speech."""
+
+    name = "vosk"
+
+    def __init__(self, model_path):
+        vosk = lazy_import("vosk")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def open(self, sample_rate):
+        return VoskSession(self._vosk.KaldiRecognizer(self.model, sample_rate))
+
+    def transcribe(self, pcm: bytes, sample_rate) -> str:
+        session = self.open(sample_rate)
+        session.accept(pcm)
+        return session.result()
+
+
+class VoskSession:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.parts = []
+
+    def accept(self, chunk: bytes):
+        if self.recognizer.AcceptWaveform(chunk):
+            self.parts.append(json.loads(self.recognizer.Result()).get("text", ""))
+
+    def result(self) -> str:
+        self.parts.append(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return " ".join(p for p in self.parts if p).strip()
+
+
+class WhisperCppEngine(SpeechEngine):
+    """Runs the whisper.cpp CLI on the finished utterance."""
+
+    name = "whisper.cpp"
+
+    def __init__(self, binary, model_path, threads=None):
+        self.binary = binary
+        self.model_path = model_path
+        self.threads = threads or os.cpu_count() or 1
+
+    def transcribe(self, pcm: bytes, sample_rate) -> str:
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+            path = f.name
+        try:
+            with wave.open(path, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(SAMPLE_WIDTH)
+                wav.setframerate(sample_rate)
+                wav.writeframes(pcm)
+            result = subprocess.run(
+                [self.binary, "-m", self.model_path, "-f", path, "-t", str(self.threads), "-nt", "-np"],
+                capture_output=True, text=True, check=True,
+            )
+            return " ".join(result.stdout.split())
+        finally:
+            os.remove(path)
+
+
+def create_engine(name, model_path=None, whisper_binary="whisper-cli"):
+    if name == "vosk":
+        return VoskEngine(model_path or "vosk-model")
+    if name in ("whisper", "whisper.cpp"):
+        return WhisperCppEngine(whisper_binary, model_path or "ggml-base.en.bin")
+    raise ValueError(f"Unknown speech engine: {name}")
+
+
+# ---------- Capture ----------
+def microphone_chunks(chunk_ms=30, sample_rate=SAMPLE_RATE):
+    """Yield 16-bit mono PCM chunks from the default microphone (PyAudio, via speech_recognition)."""
+    sr = lazy_import("speech_recognition")
+    frames = int(sample_rate * chunk_ms / 1000)
+    with sr.Microphone(sample_rate=sample_rate, chunk_size=frames) as source:
+        while True:
+            yield source.stream.read(frames)
+
+
+class SpeechListener:
+    """One utterance, captured and transcribed on a daemon thread.
+
+    state goes idle -> listening -> transcribing -> done (or error / cancelled).
+    """
+
+    def __init__(self, engine, chunks=None, chunk_ms=30, sample_rate=SAMPLE_RATE,
+                 silence_ms=700, max_seconds=15.0, start_timeout=5.0, vad=None):
+        self.engine = engine
+        self.chunks = chunks
+        self.chunk_ms = chunk_ms
+        self.sample_rate = sample_rate
+        self.silence_chunks = max(1, silence_ms // chunk_ms)
+        self.max_seconds = max_seconds
+        self.start_timeout = start_timeout
+        self.vad = vad or EnergyVAD()
+        self.state = "idle"
+        self.result = None
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.state = "listening"
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._stop.set()
+
+    @property
+    def active(self):
+        return self.state in ("listening", "transcribing")
+
+    def _run(self):
+        try:
+            text = self._listen()
+            if self._stop.is_set():
+                self.state = "cancelled"
+                return
+            self.result = text
+            self.state = "done"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "error"
+
+    def _listen(self):
+        chunks = self.chunks if self.chunks is not None else microphone_chunks(self.chunk_ms, self.sample_rate)
+        session = self.engine.open(self.sample_rate)
+        started = time.monotonic()
+        heard_speech = False
+        silent_run = 0
+        pre_roll = []  # keep a little audio before speech starts so the first syllable isn't clipped
+        try:
+            for chunk in chunks:
+                if self._stop.is_set():
+                    return None
+                elapsed = time.monotonic() - started
+                speech = self.vad.is_speech(chunk)
+                if not heard_speech:
+                    pre_roll = (pre_roll + [chunk])[-10:]
+                    if speech:
+                        heard_speech = True
+                        for buffered in pre_roll:
+                            session.accept(buffered)
+                    elif elapsed > self.start_timeout:
+                        return ""
+                    continue
+                session.accept(chunk)
+                silent_run = 0 if speech else silent_run + 1
+                if silent_run >= self.silence_chunks or elapsed > self.max_seconds:
+                    break
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+        if not heard_speech:
+            return ""
+        self.state = "transcribing"
+        return session.result()
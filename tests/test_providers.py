@@ -0,0 +1,102 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from bench.mock_ollama import start_server
+
+MODEL = "llama3.1:8b"
+MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "hello there world"}]
+
+
+@pytest.fixture
+def ollama():
+    servers = []
+
+    def start(**options):
+        server, base_url = start_server(**options)
+        servers.append(server)
+        return server.RequestHandlerClass, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def provider(base_url, **kwargs):
+    pytest.importorskip("requests")
+    from providers import OllamaProvider
+
+    return OllamaProvider(base_url, **kwargs)
+
+
+def test_mock_streams_ndjson(ollama):
+    handler, base_url = ollama()
+    body = json.dumps({"model": MODEL, "messages": MESSAGES, "stream": True}).encode()
+    with urllib.request.urlopen(urllib.request.Request(f"{base_url}/api/chat", data=body)) as response:
+        chunks = [json.loads(line) for line in response.read().splitlines() if line]
+    assert "".join(c["message"]["content"] for c in chunks) == "Echo: hello there world"
+    assert chunks[-1]["done"] and not any(c["done"] for c in chunks[:-1])
+    assert handler.requests[0]["model"] == MODEL
+
+
+def test_mock_fail_status(ollama):
+    _, base_url = ollama(fail_status=503)
+    with pytest.raises(urllib.error.HTTPError) as info:
+        urllib.request.urlopen(urllib.request.Request(f"{base_url}/api/chat", data=b"{}"))
+    assert info.value.code == 503
+
+
+def test_complete_sends_keep_alive_and_options(ollama):
+    handler, base_url = ollama()
+    text, usage = provider(base_url, keep_alive="5m").complete(MESSAGES, MODEL, 0.2, 64)
+    assert text == "Echo: hello there world"
+    assert usage > 0
+    sent = handler.requests[0]
+    assert sent["stream"] is False
+    assert sent["keep_alive"] == "5m"
+    assert sent["options"] == {"temperature": 0.2, "num_predict": 64}
+    assert sent["messages"] == MESSAGES
+
+
+def test_stream_yields_deltas_in_order(ollama):
+    handler, base_url = ollama()
+    deltas = list(provider(base_url).stream(MESSAGES, MODEL, 0.7, 64))
+    assert deltas == ["Echo:", " hello", " there", " world"]
+    assert handler.requests[0]["stream"] is True
+    assert handler.requests[0]["keep_alive"] == "30m"
+
+
+def test_stream_raises_in_band_error_after_partial_output(ollama):
+    _, base_url = ollama(error_after=2)
+    deltas = []
+    with pytest.raises(RuntimeError, match="unexpectedly stopped"):
+        for delta in provider(base_url).stream(MESSAGES, MODEL, 0.7, 64):
+            deltas.append(delta)
+    assert deltas == ["Echo:", " hello"]
+
+
+@pytest.mark.parametrize("status, retryable", [(503, True), (500, True), (429, True), (400, False)])
+def test_http_errors_retryable_by_status(ollama, status, retryable):
+    _, base_url = ollama(fail_status=status)
+    ollama_provider = provider(base_url)
+    with pytest.raises(Exception) as info:
+        ollama_provider.complete(MESSAGES, MODEL, 0.7, 64)
+    assert ollama_provider.is_retryable(info.value) is retryable
+
+
+def test_unknown_model_is_not_retryable(ollama):
+    _, base_url = ollama()
+    ollama_provider = provider(base_url)
+    with pytest.raises(Exception) as info:
+        list(ollama_provider.stream(MESSAGES, "no-such-model", 0.7, 64))
+    assert ollama_provider.is_retryable(info.value) is False
+
+
+def test_connection_refused_is_retryable():
+    ollama_provider = provider("http://127.0.0.1:9", connect_timeout=0.5)
+    with pytest.raises(Exception) as info:
+        ollama_provider.complete(MESSAGES, MODEL, 0.7, 64)
+    assert ollama_provider.is_retryable(info.value) is True
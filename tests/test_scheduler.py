@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+
+import pytest
+
+from scheduler import ModelLimits, RequestScheduler, TokenBucket, backoff_delay
+
+MODEL = "test-model"
+UNLIMITED = dict(rpm=100_000, tpm=10_000_000)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.005)
+
+
+def waiting(scheduler):
+    return scheduler.stats().get(MODEL, {}).get("waiting", 0)
+
+
+def start_request(scheduler, session_id, tokens, order, hold=None):
+    """Queue one request on a thread; it records its session when admitted."""
+
+    def run():
+        with scheduler.slot(session_id, MODEL, tokens):
+            order.append(session_id)
+            if hold is not None:
+                hold.wait(5)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)  # one per second
+    bucket.updated = 0.0
+    bucket.level = 0.0
+    assert bucket.wait_time(3, now=0.0) == pytest.approx(3.0)
+    assert bucket.wait_time(3, now=3.0) == 0.0
+
+
+def test_token_bucket_caps_requests_bigger_than_capacity():
+    bucket = TokenBucket(60)
+    bucket.updated = 0.0
+    assert bucket.wait_time(1_000, now=0.0) == 0.0
+    bucket.take(1_000)
+    # Negative level is paid back before anything else gets through
+    assert bucket.level == -940
+    assert bucket.wait_time(1, now=0.0) == pytest.approx(941.0)
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = RequestScheduler(default_limits=ModelLimits(concurrency=1, **UNLIMITED))
+    order = []
+    release = threading.Event()
+    holder = start_request(scheduler, "holder", 1, order, hold=release)
+    wait_for(lambda: order == ["holder"])
+
+    threads = []
+    for expected, session_id in enumerate(["a", "a", "a", "b", "b"], 1):
+        threads.append(start_request(scheduler, session_id, 1, order))
+        wait_for(lambda: waiting(scheduler) == expected)
+
+    release.set()
+    for thread in [holder] + threads:
+        thread.join(5)
+    assert order == ["holder", "a", "b", "a", "b", "a"]
+    # Releases are applied on the scheduler loop, just after each slot exits
+    wait_for(lambda: scheduler.stats()[MODEL] == {"active": 0, "waiting": 0})
+
+
+def test_concurrency_limit_is_respected():
+    scheduler = RequestScheduler(default_limits=ModelLimits(concurrency=2, **UNLIMITED))
+    order = []
+    release = threading.Event()
+    threads = [start_request(scheduler, f"s{i}", 1, order, hold=release) for i in range(4)]
+    wait_for(lambda: len(order) == 2 and waiting(scheduler) == 2)
+    assert scheduler.stats()[MODEL]["active"] == 2
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert sorted(order) == ["s0", "s1", "s2", "s3"]
+
+
+def test_slot_is_released_when_the_call_raises():
+    scheduler = RequestScheduler(default_limits=ModelLimits(concurrency=1, **UNLIMITED))
+    with pytest.raises(RuntimeError):
+        with scheduler.slot("a", MODEL, 1):
+            raise RuntimeError("provider failed")
+    order = []
+    start_request(scheduler, "b", 1, order).join(5)
+    assert order == ["b"]
+
+
+def test_oversized_request_is_admitted_instead_of_waiting_forever():
+    scheduler = RequestScheduler(default_limits=ModelLimits(concurrency=1, rpm=600, tpm=600))
+    order = []
+    start_request(scheduler, "a", 100_000, order).join(5)
+    assert order == ["a"]
+
+
+def test_underestimated_usage_makes_the_next_request_wait():
+    # 6000 TPM refills at 100 tokens/s
+    scheduler = RequestScheduler(default_limits=ModelLimits(concurrency=4, rpm=100_000, tpm=6000))
+    with scheduler.slot("a", MODEL, 6000) as permit:
+        permit["tokens"] = 6050  # real usage ran over the estimate: the bucket goes to -50
+    started = time.monotonic()
+    with scheduler.slot("b", MODEL, 50):
+        waited = time.monotonic() - started
+    # (50 owed + 50 requested) / 100 per second
+    assert 0.8 <= waited < 3.0
+
+
+def test_request_budget_limits_rate():
+    scheduler = RequestScheduler(default_limits=ModelLimits(concurrency=4, rpm=60, tpm=10_000_000))
+    queue = scheduler._queue(MODEL)
+    scheduler._loop.call_soon_threadsafe(queue.requests.take, queue.requests.level)  # empty the bucket
+    started = time.monotonic()
+    with scheduler.slot("a", MODEL, 1):
+        waited = time.monotonic() - started
+    assert 0.8 <= waited < 3.0
+
+
+def test_backoff_delay_is_bounded_and_jittered():
+    rng_state = random.getstate()
+    try:
+        random.seed(7)
+        delays = [backoff_delay(attempt) for attempt in range(8)]
+    finally:
+        random.setstate(rng_state)
+    for attempt, delay in enumerate(delays):
+        assert 0 <= delay <= min(30.0, 2 ** attempt)
+    assert len(set(delays)) == len(delays)
+
+
+def test_backoff_delay_honours_retry_after():
+    assert backoff_delay(0, base=0.001, retry_after=12.0) == 12.0
+    assert backoff_delay(10, cap=2.0) <= 2.0
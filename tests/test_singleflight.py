@@ -0,0 +1,208 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, StreamFlight
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.005)
+
+
+def run_threads(target, count):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = ("ok", target())
+        except Exception as e:
+            results[i] = ("error", e)
+
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def join(threads):
+    for thread in threads:
+        thread.join(5)
+        assert not thread.is_alive()
+
+
+# ---------- SingleFlight ----------
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results = run_threads(lambda: flight.do("k", fn), 5)
+    wait_for(lambda: flight.coalesced == 4)
+    release.set()
+    join(threads)
+    assert calls == [1]
+    assert all(status == "ok" and answer == "answer" for status, (answer, _) in results)
+    assert sorted(shared for _, (_, shared) in results) == [False, True, True, True, True]
+    assert flight.in_flight() == 0
+
+
+def test_exception_reaches_every_caller_and_key_is_freed():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    threads, results = run_threads(lambda: flight.do("k", fn), 3)
+    wait_for(lambda: flight.coalesced == 2)
+    release.set()
+    join(threads)
+    assert [r[0] for r in results] == ["error"] * 3
+    assert all(isinstance(r[1], ValueError) for r in results)
+    # The failure is not cached: the next call runs again
+    assert flight.do("k", lambda: "retried") == ("retried", False)
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.coalesced == 0
+
+
+# ---------- StreamFlight ----------
+class SlowUpstream:
+    """Yields its parts one at a time, each only after step() is called."""
+
+    def __init__(self, parts, error=None):
+        self.parts = parts
+        self.error = error
+        self.steps = threading.Semaphore(0)
+        self.starts = 0
+
+    def step(self, count=1):
+        for _ in range(count):
+            self.steps.release()
+
+    def __call__(self):
+        self.starts += 1
+        return self._generate()
+
+    def _generate(self):
+        for part in self.parts:
+            self.steps.acquire(timeout=5)
+            yield part
+        if self.error is not None:
+            self.steps.acquire(timeout=5)
+            raise self.error
+
+
+def consume(deltas):
+    return "".join(deltas)
+
+
+def test_subscribers_share_one_upstream():
+    flight = StreamFlight()
+    upstream = SlowUpstream(["a", "b", "c"])
+    subscriptions = [flight.subscribe("k", upstream) for _ in range(4)]
+    assert [shared for _, shared in subscriptions] == [False, True, True, True]
+    threads = []
+    outputs = []
+    for deltas, _ in subscriptions:
+        thread = threading.Thread(target=lambda d=deltas: outputs.append(consume(d)), daemon=True)
+        thread.start()
+        threads.append(thread)
+    upstream.step(3)
+    join(threads)
+    assert outputs == ["abc"] * 4
+    assert upstream.starts == 1
+    assert flight.coalesced == 3
+    wait_for(lambda: flight.in_flight() == 0)
+
+
+def test_late_joiner_replays_from_the_start():
+    flight = StreamFlight()
+    upstream = SlowUpstream(["one ", "two ", "three"])
+    first, _ = flight.subscribe("k", upstream)
+    upstream.step()
+    assert next(first) == "one "
+    # Joins after "one " was produced and already read by the first subscriber
+    late, shared = flight.subscribe("k", upstream)
+    assert shared
+    upstream.step(2)
+    assert consume(first) == "two three"
+    assert consume(late) == "one two three"
+    assert upstream.starts == 1
+
+
+def test_upstream_error_reaches_every_subscriber():
+    flight = StreamFlight()
+    upstream = SlowUpstream(["partial"], error=RuntimeError("connection reset"))
+    subscriptions = [flight.subscribe("k", upstream)[0] for _ in range(3)]
+    received = [[] for _ in subscriptions]
+    errors = []
+
+    def read(i, deltas):
+        try:
+            for delta in deltas:
+                received[i].append(delta)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=read, args=(i, d), daemon=True) for i, d in enumerate(subscriptions)]
+    for thread in threads:
+        thread.start()
+    upstream.step(2)
+    join(threads)
+    assert received == [["partial"]] * 3
+    assert errors == ["connection reset"] * 3
+    wait_for(lambda: flight.in_flight() == 0)
+
+
+def test_new_subscription_after_completion_starts_fresh():
+    flight = StreamFlight()
+    upstream = SlowUpstream(["x"])
+    deltas, _ = flight.subscribe("k", upstream)
+    upstream.step()
+    assert consume(deltas) == "x"
+    wait_for(lambda: flight.in_flight() == 0)
+    again, shared = flight.subscribe("k", upstream)
+    upstream.step()
+    assert not shared
+    assert consume(again) == "x"
+    assert upstream.starts == 2
+
+
+def test_abandoned_subscriber_does_not_stall_others():
+    flight = StreamFlight()
+    upstream = SlowUpstream(["a", "b"])
+    abandoned, _ = flight.subscribe("k", upstream)
+    reader, _ = flight.subscribe("k", upstream)
+    upstream.step()
+    assert next(abandoned) == "a"
+    abandoned.close()
+    upstream.step()
+    assert consume(reader) == "ab"
+
+
+@pytest.mark.parametrize("count", [1, 8])
+def test_many_threads_subscribe_concurrently(count):
+    flight = StreamFlight()
+    upstream = SlowUpstream(list("hello"))
+    threads, results = run_threads(lambda: consume(flight.subscribe("k", upstream)[0]), count)
+    wait_for(lambda: flight.coalesced == count - 1)
+    upstream.step(5)
+    join(threads)
+    assert results == [("ok", "hello")] * count
+    assert upstream.starts == 1
@@ -0,0 +1,543 @@
+import hashlib
+from functools import lru_cache
+
+
+def get_theme_colors(theme):
+    if theme == "Dark":
+        return {
+            "bg_gradient_1": "#0f172a",
+            "bg_gradient_2": "#1e293b",
+            "bg_gradient_3": "#020617",
+            "text_primary": "#f8fafc",
+            "text_secondary": "#94a3b8",
+            "card_bg": "rgba(30, 41, 59, 0.7)",
+            "card_border": "rgba(148, 163, 184, 0.1)",
+            "sidebar_bg": "rgba(15, 23, 42, 0.95)",
+            "user_bubble": "#2563eb",
+            "user_text": "#ffffff",
+            "assistant_bubble": "rgba(30, 41, 59, 0.7)",
+            "assistant_text": "#f1f5f9",
+            "accent": "#3b82f6",
+            "accent_glow": "rgba(59, 130, 246, 0.5)",
+            "input_bg": "rgba(15, 23, 42, 0.6)",
+            "input_border": "rgba(59, 130, 246, 0.3)",
+            "shadow": "0 3px 4px rgba(0, 0, 0, 0.25)",
+            "button_text": "#ffffff",
+            "code_bg": "#0f172a",
+            "code_text": "#e2e8f0",
+        }
+    else:  # Light theme
+        return {
+            "bg_gradient_1": "#f8fafc",
+            "bg_gradient_2": "#e2e8f0",
+            "bg_gradient_3": "#f1f5f9",
+            "text_primary": "#000000",      # Pure black
+            "text_secondary": "#333333",    # Dark gray
+            "card_bg": "rgba(255, 255, 255, 0.85)",
+            "card_border": "rgba(203, 213, 225, 0.6)",
+            "sidebar_bg": "rgba(255, 255, 255, 0.98)",
+            "user_bubble": "#2563eb",
+            "user_text": "#ffffff",
+            "assistant_bubble": "rgba(255, 255, 255, 0.9)",
+            "assistant_text": "#1e293b",
+            "accent": "#2563eb",
+            "accent_glow": "rgba(37, 99, 235, 0.3)",
+            "input_bg": "rgba(255, 255, 255, 0.8)",
+            "input_border": "rgba(37, 99, 235, 0.2)",
+            "shadow": "0 3px 6px rgba(15, 23, 42, 0.15)",
+            "button_text": "#ffffff",
+            "code_bg": "#f1f5f9",
+            "code_text": "#334155",
+        }
+
+
+# ---------- Stylesheet ----------
+# Built once per (theme, font size) and served as a static file (see asset_server.py), so a
+# rerun only sends a <link> tag instead of the whole stylesheet.
+THEMES = ("Dark", "Light")
+FONT_SIZES = {"Small": "14px", "Medium": "16px", "Large": "18px"}
+
+
+@lru_cache(maxsize=None)
+def build_stylesheet(theme, font_size):
+    colors = get_theme_colors(theme)
+    current_font_size = FONT_SIZES.get(font_size, "16px")
+
+    # Light mode sidebar CSS (BLACK TEXT + Model dropdown WHITE on BLUE)
+    light_sidebar_css = """
+    [data-testid="stSidebar"] *,
+    [data-testid="stSidebar"] label,
+    [data-testid="stSidebar"] div,
+    [data-testid="stSidebar"] p,
+    [data-testid="stSidebar"] h1, 
+    [data-testid="stSidebar"] h2, 
+    [data-testid="stSidebar"] h3 {
+        color: #000000 !important;
+    }
+    /* LIGHT MODE: Model dropdown WHITE TEXT on BLUE BG */
+    [data-testid="stSidebar"] [data-baseweb="select"] {
+        color: #ffffff !important;
+        background: rgba(37, 99, 235, 0.8) !important;
+    }
+    [data-testid="stSidebar"] [data-baseweb="select"] option {
+        color: #000000 !important;
+        background: #ffffff !important;
+    }
+    [data-testid="stSidebar"] [role="combobox"] {
+        color: #ffffff !important;
+    }
+    """ if theme == "Light" else ""
+
+    # Dark mode sidebar CSS
+    dark_sidebar_css = """
+    [data-testid="stSidebar"] *,
+    [data-testid="stSidebar"] label,
+    [data-testid="stSidebar"] div,
+    [data-testid="stSidebar"] p,
+    [data-testid="stSidebar"] h1, 
+    [data-testid="stSidebar"] h2, 
+    [data-testid="stSidebar"] h3 {
+        color: #f8fafc !important;
+    }
+    """ if theme == "Dark" else ""
+
+    return f"""
+    html, body {{
+        font-family: 'Inter', system-ui, -apple-system, 'Segoe UI', Roboto, sans-serif;
+        font-size: {current_font_size};
+        color: {colors['text_primary']};
+        background-color: transparent;
+    }}
+
+    .stApp {{
+        background: linear-gradient(-45deg, {colors['bg_gradient_1']}, {colors['bg_gradient_2']}, {colors['bg_gradient_3']}, {colors['bg_gradient_1']});
+        background-size: 400% 400%;
+        animation: gradientBG 15s ease infinite;
+        min-height: 100vh;
+        padding-top: 0;
+    }}
+
+    @keyframes gradientBG {{
+        0% {{ background-position: 0% 50%; }}
+        50% {{ background-position: 100% 50%; }}
+        100% {{ background-position: 0% 50%; }}
+    }}
+
+    header[data-testid="stHeader"], footer {{
+        visibility: hidden;
+        height: 0;
+        position: fixed;
+    }}
+
+    .main .block-container {{
+        padding-top: 0.8rem;
+        padding-bottom: 0.8rem;
+        padding-left: 1.5rem;
+        padding-right: 1.5rem;
+    }}
+
+    [data-testid="stSidebar"] {{
+        background: {colors['sidebar_bg']} !important;
+        backdrop-filter: blur(12px);
+        -webkit-backdrop-filter: blur(12px);
+        border-right: 1px solid {colors['card_border']} !important;
+        padding-top: 0.6rem;
+        padding-bottom: 0.6rem;
+        padding-left: 0.6rem;
+        padding-right: 0.6rem;
+        transition: width 0.3s ease, padding 0.3s ease;
+        width: 260px !important;
+        min-width: 260px !important;
+        max-width: 260px !important;
+    }}
+
+    /* LIGHT MODE SIDEBAR */
+    {light_sidebar_css}
+
+    /* DARK MODE SIDEBAR */
+    {dark_sidebar_css}
+
+    [data-testid="stSidebar"] > div:first-child {{
+        background: transparent;
+        width: 100%;
+    }}
+
+    ::-webkit-scrollbar {{
+        width: 6px;
+        height: 6px;
+    }}
+    ::-webkit-scrollbar-track {{
+        background: transparent;
+    }}
+    ::-webkit-scrollbar-thumb {{
+        background: {colors['card_border']};
+        border-radius: 4px;
+    }}
+    ::-webkit-scrollbar-thumb:hover {{
+        background: {colors['text_secondary']};
+    }}
+
+    .stButton > button {{
+        background: linear-gradient(135deg, {colors['accent']}, #1d4ed8) !important;
+        color: {colors['button_text']} !important;
+        border: none !important;
+        border-radius: 10px !important;
+        font-weight: 500 !important;
+        padding: 0.25rem 0.6rem !important;
+        font-size: 0.84rem !important;
+        box-shadow: {colors['shadow']};
+        transition: all 0.25s ease !important;
+        position: relative;
+        overflow: hidden;
+        min-height: 32px;
+    }}
+
+    .stButton > button:hover {{
+        transform: translateY(-1px);
+        box-shadow: 0 8px 16px -4px {colors['accent_glow']};
+    }}
+
+    .stButton > button:active {{
+        transform: translateY(0);
+    }}
+
+    .stTextInput > div > div > input,
+    .stTextArea > div > div > textarea,
+    .stSelectbox > div > div > select {{
+        background: {colors['input_bg']} !important;
+        border: 1px solid {colors['input_border']} !important;
+        color: {colors['text_primary']} !important;
+        border-radius: 10px !important;
+        backdrop-filter: blur(4px);
+        padding-top: 0.3rem !important;
+        padding-bottom: 0.3rem !important;
+    }}
+
+    [data-testid="stChatInput"] > div {{
+        background: {colors['input_bg']};
+        border: 1px solid {colors['input_border']};
+        border-radius: 18px;
+        box-shadow: {colors['shadow']};
+        backdrop-filter: blur(10px);
+        padding: 0.15rem 0.6rem !important;
+        transition: all 0.3s ease;
+        min-height: 42px;
+    }}
+
+    [data-testid="stChatInput"] textarea {{
+        min-height: 24px !important;
+        max-height: 80px !important;
+        padding-top: 0.25rem !important;
+        padding-bottom: 0.25rem !important;
+    }}
+
+    [data-testid="stChatInput"] > div:focus-within {{
+        border-color: {colors['accent']};
+        box-shadow: 0 0 0 2px {colors['accent_glow']};
+    }}
+
+    .chat-message {{
+        display: flex;
+        align-items: flex-start;
+        margin-bottom: 0.9rem;
+        animation: fadeIn 0.3s ease-out;
+    }}
+
+    @keyframes fadeIn {{
+        from {{ opacity: 0; transform: translateY(6px); }}
+        to {{ opacity: 1; transform: translateY(0); }}
+    }}
+
+    .user-message {{
+        justify-content: flex-end;
+    }}
+
+    .avatar {{
+        width: 32px;
+        height: 32px;
+        border-radius: 50%;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        margin: 0 6px;
+        flex-shrink: 0;
+        box-shadow: {colors['shadow']};
+        font-size: 0.9rem;
+    }}
+
+    .message-content {{
+        padding: 0.6rem 0.75rem;
+        border-radius: 14px;
+        max-width: 80%;
+        position: relative;
+        box-shadow: {colors['shadow']};
+        backdrop-filter: blur(6px);
+        word-wrap: break-word;
+        font-size: 0.92rem;
+    }}
+
+    .user-message .message-content {{
+        background: {colors['user_bubble']};
+        color: {colors['user_text']};
+        border-radius: 14px 14px 3px 14px;
+    }}
+
+    .assistant-message .message-content {{
+        background: {colors['assistant_bubble']};
+        color: {colors['assistant_text']};
+        border-radius: 14px 14px 14px 3px;
+        border: 1px solid {colors['card_border']};
+    }}
+
+    .mode-card {{
+        background: {colors['card_bg']};
+        border: 1px solid {colors['card_border']};
+        border-radius: 12px;
+        padding: 0.5rem 0.6rem;
+        text-align: center;
+        cursor: pointer;
+        transition: all 0.25s ease;
+        backdrop-filter: blur(8px);
+        box-shadow: {colors['shadow']};
+        height: 100%;
+        color: {colors['text_primary']};
+        margin-bottom: 0.4rem;
+    }}
+
+    .mode-card div:first-child {{
+        font-size: 1.4rem;
+        margin-bottom: 0.25rem;
+    }}
+
+    .mode-card div:nth-child(2) {{
+        font-size: 0.9rem;
+    }}
+
+    .mode-card div:nth-child(3) {{
+        font-size: 0.7rem;
+    }}
+
+    .mode-card:hover {{
+        transform: translateY(-2px);
+        box-shadow: 0 8px 14px {colors['accent_glow']};
+        border-color: {colors['accent']};
+    }}
+
+    .mode-card.active {{
+        background: linear-gradient(135deg, {colors['accent']}, #1d4ed8);
+        color: white;
+        border: none;
+    }}
+
+    .file-preview {{
+        background: {colors['card_bg']};
+        border: 1px solid {colors['card_border']};
+        border-radius: 10px;
+        padding: 0.6rem 0.75rem;
+        margin-bottom: 0.6rem;
+        display: flex;
+        align-items: center;
+        justify-content: space-between;
+        backdrop-filter: blur(8px);
+        box-shadow: {colors['shadow']};
+        color: {colors['text_primary']};
+        font-size: 0.86rem;
+    }}
+
+    .welcome-container {{
+        display: flex;
+        flex-direction: column;
+        align-items: center;
+        justify-content: center;
+        position: relative;
+        z-index: 10;
+    }}
+
+    .welcome-card {{
+        background: {colors['card_bg']};
+        backdrop-filter: blur(16px);
+        -webkit-backdrop-filter: blur(16px);
+        border: 1px solid {colors['card_border']};
+        border-radius: 20px;
+        padding: 2rem 2.2rem;
+        width: 100%;
+        max-width: 420px;
+        box-shadow: 0 22px 40px -14px {colors['accent_glow']};
+        animation: slideUp 0.4s ease-out;
+        color: {colors['text_primary']};
+    }}
+
+    @keyframes slideUp {{
+        from {{ opacity: 0; transform: translateY(18px); }}
+        to {{ opacity: 1; transform: translateY(0); }}
+    }}
+
+    .logo-container {{
+        width: 96px;
+        height: 96px;
+        background: linear-gradient(135deg, {colors['accent']}, #1d4ed8);
+        border-radius: 24px;
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-size: 46px;
+        margin: 0 auto 1.4rem;
+        box-shadow: 0 18px 32px {colors['accent_glow']};
+        animation: float 6s ease-in-out infinite;
+    }}
+
+    @keyframes float {{
+        0% {{ transform: translateY(0px); }}
+        50% {{ transform: translateY(-8px); }}
+        100% {{ transform: translateY(0px); }}
+    }}
+
+    pre {{
+        background: {colors['code_bg']} !important;
+        color: {colors['code_text']} !important;
+        border-radius: 6px !important;
+        padding: 0.7rem !important;
+        border: 1px solid {colors['card_border']} !important;
+        font-size: 0.86rem !important;
+    }}
+
+    .streamlit-expanderHeader {{
+        background: {colors['card_bg']} !important;
+        color: {colors['text_primary']} !important;
+        border: 1px solid {colors['card_border']} !important;
+        border-radius: 6px !important;
+        padding-top: 0.35rem !important;
+        padding-bottom: 0.35rem !important;
+        font-size: 0.9rem !important;
+    }}
+
+    [data-testid="stSidebarHeader"] > button {{
+        background: transparent !important;
+        color: {colors['text_primary']} !important;
+    }}
+
+    .app-header {{
+        display: flex;
+        align-items: center;
+        gap: 14px;
+        margin: 0 0 0.7rem 0;
+        padding: 0.7rem 0.9rem;
+        background: {colors['card_bg']};
+        border-radius: 14px;
+        border: 1px solid {colors['card_border']};
+        backdrop-filter: blur(8px);
+        box-shadow: {colors['shadow']};
+    }}
+
+    .app-header .app-logo {{
+        width: 48px;
+        height: 48px;
+        border-radius: 16px;
+        background: radial-gradient(circle at 30% 10%, {colors['accent']}, #1d4ed8);
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        color: white;
+        font-size: 26px;
+        box-shadow: {colors['shadow']};
+    }}
+
+    .app-header .app-title {{
+        font-weight: 700;
+        color: {colors['text_primary']};
+        font-size: 1.25rem;
+    }}
+
+    .app-header .app-subtitle {{
+        font-size: 0.8rem;
+        opacity: 0.85;
+        color: {colors['text_secondary']};
+    }}
+
+    .sidebar-brand {{
+        text-align: left;
+        padding: 0 0 0.6rem 0;
+        border-bottom: 1px solid {colors['card_border']};
+        margin-bottom: 0.8rem;
+        display: flex;
+        align-items: center;
+        gap: 0.6rem;
+    }}
+
+    .sidebar-brand .app-logo {{
+        width: 32px;
+        height: 32px;
+        border-radius: 10px;
+        background: linear-gradient(135deg, {colors['accent']}, #1d4ed8);
+        display: flex;
+        align-items: center;
+        justify-content: center;
+        font-size: 18px;
+        box-shadow: {colors['shadow']};
+    }}
+
+    .sidebar-brand .app-title {{
+        color: {colors['text_primary']};
+        font-weight: 600;
+        font-size: 0.98rem;
+    }}
+
+    .sidebar-brand .app-subtitle {{
+        color: {colors['text_secondary']};
+        font-size: 0.75rem;
+    }}
+
+    .welcome-title {{
+        text-align: center;
+        margin-bottom: 0.3rem;
+        font-weight: 700;
+        font-size: 2.1rem;
+        color: {colors['text_primary']};
+    }}
+
+    .welcome-subtitle {{
+        text-align: center;
+        margin-bottom: 1.2rem;
+        opacity: 0.8;
+        color: {colors['text_secondary']};
+    }}
+
+    .welcome-prompt {{
+        text-align: center;
+        margin-bottom: 0.9rem;
+        font-weight: 600;
+        font-size: 1.4rem;
+        color: {colors['text_primary']};
+    }}
+
+    .empty-hint {{
+        color: {colors['text_secondary']};
+        margin-top: 0.8rem;
+        text-align: center;
+        font-size: 0.9rem;
+    }}
+
+    .file-preview-close {{
+        background: transparent;
+        border: none;
+        color: {colors['text_secondary']};
+        cursor: pointer;
+        font-size: 1rem;
+    }}
+    """
+
+
+@lru_cache(maxsize=None)
+def stylesheet_name(theme, font_size):
+    """Content-hashed file name, so the browser can cache it forever."""
+    digest = hashlib.sha256(build_stylesheet(theme, font_size).encode("utf-8")).hexdigest()[:12]
+    return f"theme-{theme.lower()}-{font_size.lower()}-{digest}.css"
+
+
+def all_stylesheets():
+    """{file name: css} for every theme and font size combination."""
+    return {
+        stylesheet_name(theme, font_size): build_stylesheet(theme, font_size)
+        for theme in THEMES
+        for font_size in FONT_SIZES
+    }
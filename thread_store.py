@@ -0,0 +1,108 @@
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from message_store import Message
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    title TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_owner_created ON threads (owner, created);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    thread_id TEXT NOT NULL REFERENCES threads (id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    created REAL
+);
+CREATE INDEX IF NOT EXISTS messages_thread_id ON messages (thread_id, id);
+"""
+
+
+class ThreadStore:
+    """SQLite-backed chat history shared by every session in the process."""
+
+    def __init__(self, path="chat_history.db"):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(SCHEMA)
+            # Databases from before numeric timestamps: old rows keep only their "HH:MM" text
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(messages)")}
+            if "created" not in columns:
+                self._conn.execute("ALTER TABLE messages ADD COLUMN created REAL")
+
+    @staticmethod
+    def _thread_meta(row):
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "created": datetime.fromtimestamp(row["created"]),
+        }
+
+    def list_threads(self, owner):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, created FROM threads WHERE owner = ? ORDER BY created DESC",
+                (owner,),
+            ).fetchall()
+        return [self._thread_meta(row) for row in rows]
+
+    def create_thread(self, owner, title="New Chat"):
+        thread_id = str(uuid.uuid4())
+        created = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO threads (id, owner, title, created) VALUES (?, ?, ?, ?)",
+                (thread_id, owner, title, created),
+            )
+        return {"id": thread_id, "title": title, "created": datetime.fromtimestamp(created)}
+
+    def rename_thread(self, thread_id, title):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE threads SET title = ? WHERE id = ?", (title, thread_id))
+
+    def delete_thread(self, thread_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM threads WHERE id = ?", (thread_id,))
+
+    def delete_all(self, owner):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM threads WHERE owner = ?", (owner,))
+
+    def add_message(self, thread_id, role, content, created=None):
+        """Persist a message and return it as a compact Message record."""
+        created = time.time() if created is None else created
+        timestamp = datetime.fromtimestamp(created).strftime("%H:%M")
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO messages (thread_id, role, content, timestamp, created) VALUES (?, ?, ?, ?, ?)",
+                (thread_id, role, content, timestamp, created),
+            )
+        return Message(cursor.lastrowid, role, content, created)
+
+    def load_messages(self, thread_id, before_id=None, limit=50):
+        """Return up to `limit` messages older than `before_id`, oldest first, and whether more remain."""
+        query = "SELECT id, role, content, timestamp, created FROM messages WHERE thread_id = ?"
+        params = [thread_id]
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        has_more = len(rows) > limit
+        messages = [Message.from_row(row) for row in reversed(rows[:limit])]
+        return messages, has_more
@@ -0,0 +1,83 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from theme import get_theme_colors
+
+
+def user_bubble_html(content, timestamp, colors):
+    return f"""<div class="chat-message user-message">
+<div class="message-content">
+<div style="font-size: 0.7rem; opacity: 0.7; margin-bottom: 0.25rem; text-align: right;">You • {timestamp}</div>
+<div style="white-space: pre-wrap;">{content}</div>
+</div>
+<div class="avatar" style="background: linear-gradient(135deg, {colors['accent']}, #1d4ed8); color: white;">👤</div>
+</div>"""
+
+
+def assistant_bubble_html(content, timestamp, colors):
+    return f"""<div class="chat-message assistant-message">
+<div class="avatar" style="background: linear-gradient(135deg, {colors['accent']}, #1d4ed8); color: white;">💻</div>
+<div class="message-content">
+<div style="font-size: 0.7rem; opacity: 0.7; margin-bottom: 0.25rem;">Code Gen Ai • {timestamp}</div>
+<div style="white-space: pre-wrap;">{content}</div>
+</div>
+</div>"""
+
+
+# Finished messages never change, so their HTML is built once per theme and reused across reruns
+# and sessions. Keyed by message id rather than content, so compressed messages are only expanded
+# on a miss, and bounded by bytes so it is a fixed process-wide overhead.
+HTML_CACHE_BYTES = 8 * 1024 * 1024
+
+
+class MessageHTMLCache:
+    def __init__(self, max_bytes=HTML_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def get(self, message, theme):
+        key = (message.get("id"), theme)
+        if key[0] is not None:
+            with self._lock:
+                html = self._entries.get(key)
+                if html is not None:
+                    self._entries.move_to_end(key)
+                    return html
+        html = message_html(message["role"], message["content"], message.get("timestamp", "now"), theme)
+        size = sys.getsizeof(html)
+        if key[0] is None or size > self.max_bytes:
+            return html
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = html
+                self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.nbytes -= sys.getsizeof(evicted)
+        return html
+
+
+HTML_CACHE = MessageHTMLCache()
+
+
+def message_html(role, content, timestamp, theme):
+    colors = get_theme_colors(theme)
+    if role == "user":
+        return user_bubble_html(content, timestamp, colors)
+    return assistant_bubble_html(content, timestamp, colors)
+
+
+def transcript_html(messages, theme):
+    return "\n\n".join(
+        HTML_CACHE.get(msg, theme)
+        for msg in messages
+        if msg["role"] in ("user", "assistant")
+    )